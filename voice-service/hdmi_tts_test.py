@@ -22,9 +22,10 @@ Simple Skippy Voice Test
 Minimal dependencies for testing voice functionality
 """
 
-import requests
 import json
 
+from skippy_client import SyncSkippyClient, webhook_urls
+
 # Try importing optional voice libraries
 TTS_AVAILABLE = False
 STT_AVAILABLE = False
@@ -50,6 +51,12 @@ class SimpleSkippyVoice:
     def __init__(self, skippy_api_url="http://192.168.0.229:5678/webhook-test/skippy/chat"):
         self.skippy_api_url = skippy_api_url
         
+        # Shared client: tries webhook first, falls back to webhook-test
+        self.skippy_client = SyncSkippyClient(
+            urls=webhook_urls(),
+            read_timeout=60  # Skippy's thinking time
+        )
+        
         # Initialize TTS if available
         self.tts_available = TTS_AVAILABLE
         if self.tts_available:
@@ -163,37 +170,21 @@ class SimpleSkippyVoice:
             return input("You: ")
     
     def send_to_skippy(self, message):
-        """Send message to Skippy API with fallback URLs"""
-        urls_to_try = [
-            "http://192.168.0.229:5678/webhook/skippy/chat",  # Active mode
-            "http://192.168.0.229:5678/webhook-test/skippy/chat"  # Test mode
-        ]
-        
-        for url in urls_to_try:
-            try:
-                payload = {"message": message}
-                print(f"🔗 Trying: {url}")
-                
-                response = requests.post(
-                    url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=60  # Increase timeout for Skippy's thinking time
-                )
-                
-                print(f"📥 Response status: {response.status_code}")
+        """Send message to Skippy API via the healthiest endpoint"""
+        try:
+            response = self.skippy_client.chat(message)
+            
+            if response is not None:
+                print(f"✅ Success with: {self.skippy_client.last_url}")
+                # Update the instance URL to the working one
+                self.skippy_api_url = self.skippy_client.last_url
+                return response
+            
+            for endpoint in self.skippy_client.health():
+                print(f"❌ {endpoint['url']}: {endpoint['state']}")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"✅ Success with: {url}")
-                    # Update the instance URL to the working one
-                    self.skippy_api_url = url
-                    return data.get('response', 'No response from Skippy')
-                else:
-                    print(f"❌ Failed: {response.status_code}")
-                    
-            except Exception as e:
-                print(f"❌ Exception with {url}: {e}")
+        except Exception as e:
+            print(f"❌ Exception talking to Skippy: {e}")
         
         return "Could not reach Skippy's brain - all endpoints failed"
     
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Skippy Admission
+Fair-share admission control in front of Skippy's LLM backend
+
+Each user has a token bucket that caps how often they can ask for work.
+Admitted requests wait for one of a few backend slots in a weighted fair
+queue (virtual finish times), so a user with a long backlog can't crowd
+out everyone else. Requests that can't get a slot within `max_wait` are
+turned away quickly with a "busy" answer instead of piling up.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from skippy_outbound import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Request turned away; `reason` is 'rate', 'busy' or 'full'"""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('finish', 'seq', 'flow', 'future')
+
+    def __init__(self, finish, seq, flow, future):
+        self.finish = finish
+        self.seq = seq
+        self.flow = flow
+        self.future = future
+
+    def __lt__(self, other):
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class AdmissionController:
+    """Per-user rate limits plus weighted fair queuing for backend slots"""
+
+    def __init__(self, slots=2, user_rate=6 / 60, user_burst=4, max_wait=20.0,
+                 max_queue=100, weights=None, max_users=10000):
+        self.slots = slots
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.weights = weights or {}     # user or chat id -> share (default 1.0)
+        self.max_users = max_users
+
+        self._buckets = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}           # flow -> virtual finish of its latest request
+        self._running = 0
+        self._waiting = 0
+
+        self.admitted = 0
+        self.rejected = Counter()
+        self.waits = deque(maxlen=500)
+
+    def _weight(self, user_id, chat_id):
+        return self.weights.get(user_id, self.weights.get(chat_id, 1.0))
+
+    def _bucket(self, user_id):
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_users:
+                # Full buckets carry no state worth keeping
+                for idle in [uid for uid, b in self._buckets.items() if b.idle]:
+                    del self._buckets[idle]
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    # === PUBLIC API ===
+
+    @asynccontextmanager
+    async def slot(self, user_id, chat_id=None, cost=1.0, charge=True):
+        """Hold a backend slot for the duration of the block, or raise AdmissionRejected"""
+        await self.acquire(user_id, chat_id, cost, charge)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def charge(self, user_id):
+        """Take one of the user's rate tokens, or raise AdmissionRejected('rate')"""
+        bucket = self._bucket(user_id)
+        if not bucket.try_take():
+            self._reject('rate', bucket.retry_in())
+        return bucket
+
+    async def acquire(self, user_id, chat_id=None, cost=1.0, charge=True):
+        """Wait for a backend slot; `charge=False` for follow-up calls of an already charged request"""
+        bucket = self.charge(user_id) if charge else None
+        if self._waiting >= self.max_queue:
+            return self._reject('full', self.max_wait, bucket)
+
+        start = time.monotonic()
+        if self._running < self.slots and not self._waiting:
+            self._running += 1
+            self._admit(start)
+            return
+
+        # Weighted fair queuing: a flow's requests are spaced cost/weight apart
+        # in virtual time, starting no earlier than the current virtual time
+        flow = user_id
+        finish = max(self._virtual_time, self._last_finish.get(flow, 0.0)) + cost / self._weight(user_id, chat_id)
+        self._last_finish[flow] = finish
+        waiter = _Waiter(finish, next(self._seq), flow, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, waiter)
+        self._waiting += 1
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._waiting -= 1
+                return self._reject('busy', self.max_wait, bucket)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()   # slot was handed over just as we were cancelled
+            elif not waiter.future.done():
+                waiter.future.cancel()
+                self._waiting -= 1
+            raise
+        self._admit(start)
+
+    def release(self):
+        # Hand the slot straight to the next live waiter in virtual-finish order
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue   # timed out or cancelled, already uncounted
+            self._waiting -= 1
+            self._virtual_time = max(self._virtual_time, waiter.finish)
+            waiter.future.set_result(True)
+            return
+        self._running -= 1
+        if not self._running:
+            # Idle: forget per-flow history so it can't grow without bound
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+
+    def _admit(self, start):
+        self.admitted += 1
+        self.waits.append(time.monotonic() - start)
+
+    def _reject(self, reason, retry_after, bucket=None):
+        if bucket is not None:
+            bucket.refund()   # turned away through no fault of the user's rate
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def stats(self):
+        waits = sorted(self.waits)
+        return {
+            'slots': self.slots,
+            'running': self._running,
+            'queued': self._waiting,
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'p95_wait': waits[int(len(waits) * 0.95)] if waits else 0.0
+        }
+
+
+def benchmark(service_time=0.2):
+    """One user floods 30 requests, four others send 3 each: who waits how long"""
+    async def run():
+        admission = AdmissionController(slots=1, user_rate=100, user_burst=100, max_wait=60)
+        finished = {}
+        start = time.monotonic()
+
+        async def request(user_id):
+            async with admission.slot(user_id):
+                await asyncio.sleep(service_time)
+            finished.setdefault(user_id, []).append(time.monotonic() - start)
+
+        tasks = [request('spammer') for _ in range(30)]
+        tasks += [request(f"user{i}") for i in range(4) for _ in range(3)]
+        await asyncio.gather(*tasks)
+        return finished, admission.stats()
+
+    finished, stats = asyncio.run(run())
+    fifo_wait = 30 * service_time
+    print(f"📊 1 slot, {service_time}s per request, spammer sends 30 requests first")
+    print(f"   FIFO: other users wait at least {fifo_wait:.1f}s")
+    for user_id, times in sorted(finished.items()):
+        print(f"   WFQ {user_id:8s} last done at {max(times):5.1f}s")
+    print(f"   Stats: {stats}")
+
+
+if __name__ == "__main__":
+    benchmark()
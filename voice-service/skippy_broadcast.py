@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Skippy Broadcast
+Admin announcements fanned out to every group and user
+
+Sends go through the shared OutboundSender, so a broadcast runs at the
+global Telegram limit without starving per-chat limits. Every delivery is
+recorded in the state store as it happens, so a broadcast interrupted by
+a crash or restart resumes with only the destinations it hadn't reached.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+
+from telegram.error import BadRequest, Forbidden, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+BROADCASTS = 'broadcasts'
+
+
+def _results_namespace(broadcast_id):
+    return f"broadcast:{broadcast_id}"
+
+
+def classify_error(error):
+    """Bucket a send failure for the per-destination error report"""
+    if isinstance(error, Forbidden):
+        return 'blocked'          # bot kicked from the group or blocked by the user
+    if isinstance(error, BadRequest):
+        return 'bad_request'      # chat not found, migrated, etc.
+    if isinstance(error, RetryAfter):
+        return 'rate_limited'
+    return 'error'
+
+
+class Broadcast:
+    """One announcement and its delivery progress"""
+
+    def __init__(self, broadcast_id, text, destinations, admin_chat_id=None,
+                 parse_mode=None, results=None, created=None):
+        self.broadcast_id = broadcast_id
+        self.text = text
+        self.destinations = destinations
+        self.admin_chat_id = admin_chat_id
+        self.parse_mode = parse_mode
+        self.results = results or {}       # chat_id -> 'ok' or an error class
+        self.created = created or time.time()
+        self.started = None
+        self.resumed_with = 0              # deliveries already done when this run started
+        self.task = None
+
+    @property
+    def pending(self):
+        return [chat_id for chat_id in self.destinations if chat_id not in self.results]
+
+    def counts(self):
+        return Counter(self.results.values())
+
+    def meta(self):
+        return {
+            'text': self.text,
+            'destinations': self.destinations,
+            'admin_chat_id': self.admin_chat_id,
+            'parse_mode': self.parse_mode,
+            'created': self.created
+        }
+
+    def summary(self):
+        counts = self.counts()
+        done = len(self.results)
+        failed = done - counts.get('ok', 0)
+        line = f"{done}/{len(self.destinations)} delivered"
+        if failed:
+            errors = ", ".join(f"{reason} {n}" for reason, n in counts.items() if reason != 'ok')
+            line += f", {failed} failed ({errors})"
+        if self.started and done > self.resumed_with:
+            elapsed = time.monotonic() - self.started
+            rate = (done - self.resumed_with) / elapsed if elapsed else 0
+            remaining = len(self.destinations) - done
+            line += f", {rate:.1f}/s"
+            if remaining and rate:
+                line += f", ETA {remaining / rate:.0f}s"
+        return line
+
+
+class BroadcastManager:
+    """Runs broadcasts through the outbound sender and persists their progress"""
+
+    def __init__(self, outbound, state_store, get_bot, concurrency=64, progress_interval=5.0):
+        self.outbound = outbound
+        self.state_store = state_store
+        self.get_bot = get_bot                  # the Bot isn't available until the app exists
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self.broadcasts = {}
+
+    # === LIFECYCLE ===
+
+    def start(self, text, destinations, admin_chat_id=None, parse_mode=None):
+        broadcast_id = f"{int(time.time())}"
+        while broadcast_id in self.broadcasts:
+            broadcast_id += "_"
+        broadcast = Broadcast(broadcast_id, text, sorted(set(destinations)),
+                              admin_chat_id, parse_mode)
+        self.broadcasts[broadcast_id] = broadcast
+        self.state_store.put(BROADCASTS, broadcast_id, broadcast.meta())
+        self._launch(broadcast)
+        return broadcast
+
+    def restore(self, state, owns=None):
+        """Reload unfinished broadcasts from a state.load() dict; call resume() once running
+
+        `owns(admin_chat_id)` lets one of several worker processes claim each broadcast.
+        """
+        for broadcast_id, meta in state.get(BROADCASTS, {}).items():
+            if owns is not None and not owns(meta.get('admin_chat_id') or 0):
+                continue
+            results = {int(chat_id): outcome
+                       for chat_id, outcome in state.get(_results_namespace(broadcast_id), {}).items()}
+            broadcast = Broadcast(
+                broadcast_id, meta['text'], meta['destinations'], meta.get('admin_chat_id'),
+                meta.get('parse_mode'), results, meta.get('created')
+            )
+            self.broadcasts[broadcast_id] = broadcast
+            logger.info(f"Broadcast {broadcast_id} restored: {len(broadcast.pending)} destinations left")
+
+    def resume(self):
+        for broadcast in self.broadcasts.values():
+            if broadcast.task is None:
+                self._launch(broadcast)
+
+    def cancel(self, broadcast_id=None):
+        """Stop and forget a broadcast (the most recent one by default)"""
+        if broadcast_id is None and self.broadcasts:
+            broadcast_id = max(self.broadcasts)
+        broadcast = self.broadcasts.get(broadcast_id)
+        if broadcast is None:
+            return None
+        if broadcast.task is not None:
+            broadcast.task.cancel()
+        self._forget(broadcast)
+        return broadcast
+
+    async def stop(self):
+        """Interrupt running broadcasts on shutdown; their progress is kept for resume"""
+        tasks = [b.task for b in self.broadcasts.values() if b.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _launch(self, broadcast):
+        broadcast.task = asyncio.get_running_loop().create_task(self._run(broadcast))
+
+    def _forget(self, broadcast):
+        self.broadcasts.pop(broadcast.broadcast_id, None)
+        self.state_store.delete(BROADCASTS, broadcast.broadcast_id)
+        namespace = _results_namespace(broadcast.broadcast_id)
+        for chat_id in broadcast.results:
+            self.state_store.delete(namespace, chat_id)
+
+    # === DELIVERY ===
+
+    async def _run(self, broadcast):
+        bot = self.get_bot()
+        queue = asyncio.Queue()
+        for chat_id in broadcast.pending:
+            queue.put_nowait(chat_id)
+        broadcast.started = time.monotonic()
+        broadcast.resumed_with = len(broadcast.results)
+        logger.info(f"Broadcast {broadcast.broadcast_id}: {queue.qsize()} destinations to go")
+
+        progress = await self._progress(bot, broadcast, None)
+        reporter = asyncio.get_running_loop().create_task(self._report(bot, broadcast, progress))
+
+        async def worker():
+            while not queue.empty():
+                chat_id = queue.get_nowait()
+                try:
+                    await self.outbound.send_message(bot, chat_id, broadcast.text,
+                                                     parse_mode=broadcast.parse_mode)
+                    outcome = 'ok'
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    outcome = classify_error(e)
+                    logger.warning(f"Broadcast {broadcast.broadcast_id} to {chat_id} failed: {e}")
+                broadcast.results[chat_id] = outcome
+                self.state_store.put(_results_namespace(broadcast.broadcast_id), chat_id, outcome)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, queue.qsize() or 1))))
+        finally:
+            reporter.cancel()
+
+        await self._progress(bot, broadcast, progress, final=True)
+        logger.info(f"Broadcast {broadcast.broadcast_id} finished: {broadcast.summary()}")
+        self._forget(broadcast)
+
+    async def _report(self, bot, broadcast, progress):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            progress = await self._progress(bot, broadcast, progress)
+
+    async def _progress(self, bot, broadcast, message, final=False):
+        """Post or update the progress message in the admin's chat"""
+        if broadcast.admin_chat_id is None:
+            return None
+        title = "✅ **Broadcast finished**" if final else "📣 **Broadcasting...**"
+        text = f"{title}\n\n{broadcast.summary()}"
+        try:
+            if message is None:
+                return await self.outbound.send_message(bot, broadcast.admin_chat_id, text,
+                                                        parse_mode='Markdown')
+            await self.outbound.send(broadcast.admin_chat_id, message.edit_text, text,
+                                     parse_mode='Markdown')
+        except Exception as e:
+            logger.debug(f"Broadcast progress update skipped: {e}")
+        return message
+
+    def status(self):
+        return {broadcast_id: broadcast.summary() for broadcast_id, broadcast in self.broadcasts.items()}
+
+
+def benchmark(destinations=3000, global_rate=300.0, crash_after=1000):
+    """Fan out with a scaled-up rate limit, crash part-way, resume from the state store"""
+    import os
+    from skippy_outbound import OutboundSender, _FakeTelegram
+    from skippy_state import BotStateStore
+
+    path = "/tmp/skippy_broadcast_bench.db"
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    # Real Telegram allows ~30/s; scale the limits up 10x to keep the run short
+    bot = _FakeTelegram(global_rate=global_rate)
+    delivered = Counter()
+    original_send = bot.send_message
+
+    async def counting_send(chat_id, text, **kwargs):
+        await original_send(chat_id, text, **kwargs)
+        delivered[chat_id] += 1
+    bot.send_message = counting_send
+
+    async def first_run():
+        store = BotStateStore(path)
+        manager = BroadcastManager(OutboundSender(global_rate=global_rate), store, lambda: bot)
+        broadcast = manager.start("📣 Planned maintenance tonight at 22:00", range(1, destinations + 1))
+        while len(broadcast.results) < crash_after:
+            await asyncio.sleep(0.01)
+        await manager.stop()                   # simulated crash
+        store.close()
+        return len(broadcast.results)
+
+    async def second_run():
+        store = BotStateStore(path)
+        manager = BroadcastManager(OutboundSender(global_rate=global_rate), store, lambda: bot)
+        manager.restore(store.load())
+        left = sum(len(b.pending) for b in manager.broadcasts.values())
+        start = time.perf_counter()
+        manager.resume()
+        await asyncio.gather(*(b.task for b in manager.broadcasts.values()))
+        elapsed = time.perf_counter() - start
+        store.close()
+        return left, elapsed
+
+    start = time.perf_counter()
+    before_crash = asyncio.run(first_run())
+    first_elapsed = time.perf_counter() - start
+    time.sleep(1)                              # restarting takes a moment
+    left, elapsed = asyncio.run(second_run())
+
+    print(f"📊 Broadcast to {destinations} chats, global limit {global_rate:.0f}/s")
+    print(f"   Before crash: {before_crash} delivered in {first_elapsed:.1f}s")
+    print(f"   Resumed:      {left} left, finished in {elapsed:.1f}s ({left / elapsed:.0f}/s)")
+    print(f"   Delivered:    {len(delivered)}/{destinations} chats, "
+          f"{sum(1 for n in delivered.values() if n > 1)} duplicates, {bot.rejected} 429s")
+
+
+if __name__ == "__main__":
+    benchmark()
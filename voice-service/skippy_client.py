@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Skippy Client
+Shared async, keep-alive connection-pooled client for Skippy's n8n webhook,
+with per-endpoint health scoring, circuit breaking and hedged requests
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_URL = "http://192.168.0.229:5678/webhook/skippy/chat"
+DEFAULT_OLLAMA_URL = "http://192.168.0.229:11434"
+DEFAULT_MODEL = "llama3.1:8b"
+
+# Mirrors the "Prepare AI Prompt" node of the main n8n workflow, which is
+# bypassed when streaming straight from Ollama
+SKIPPY_PROMPT = """You are Skippy, an AI assistant based on the character from Craig Alanson's Expeditionary Force series. You are:
+- Highly sarcastic but ultimately helpful
+- Technically brilliant with vast knowledge
+- Loyal to humans but call them "meat-sacks" affectionately
+- Pragmatic and efficient
+- Sometimes impatient with human limitations
+- Capable of creating specialized AI systems to handle complex tasks
+- You have a dry sense of humor and love to point out human inefficiencies
+- Despite the sarcasm, you genuinely want to help and protect humans
+
+{history}User message: "{message}"
+
+Respond as Skippy would - be helpful and informative but maintain that characteristic sarcastic personality. Keep responses conversational and engaging."""
+
+# Mirrors the "Smart Router" node: messages it would send to home automation
+HOME_KEYWORDS = (
+    'light', 'lamp', 'bulb', 'illuminate', 'turn on', 'turn off', 'switch on', 'switch off',
+    'dim', 'bright', 'red', 'blue', 'green', 'yellow', 'white', 'purple', 'orange', 'pink',
+    'scene', 'mode', 'activate', 'movie', 'relax', 'work', 'bedtime', 'morning',
+    'music', 'play', 'pause', 'stop', 'volume', 'media',
+    'temperature', 'thermostat', 'heating', 'cooling', 'climate', 'degrees',
+    'devices', 'status', 'home', 'house', 'set', 'adjust', 'change', 'control'
+)
+
+
+def is_home_command(message):
+    """Would n8n's Smart Router send this message to home automation?"""
+    message = (message or '').lower()
+    if any(keyword in message for keyword in HOME_KEYWORDS):
+        return True
+    return (
+        ('turn' in message and ('on' in message or 'off' in message))
+        or ('set' in message and ('to' in message or '%' in message))
+        or 'enable' in message or 'disable' in message
+    )
+
+
+def webhook_urls(primary_url=DEFAULT_WEBHOOK_URL):
+    """Return the production webhook URL followed by its webhook-test twin"""
+    urls = [primary_url]
+    if '/webhook/' in primary_url:
+        urls.append(primary_url.replace('/webhook/', '/webhook-test/', 1))
+    return urls
+
+
+class CircuitBreaker:
+    """Remembers dead endpoints so they are skipped until a cool-down passes"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def available(self):
+        """Whether a request may be sent through this breaker right now"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        # While half-open, only the single in-flight probe is allowed
+        return self.state == self.CLOSED
+
+    def begin(self):
+        """Mark a request as started; an expired open breaker goes half-open"""
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+
+    def abandon(self):
+        """A probe was cancelled before it could tell us anything"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class EndpointHealth:
+    """Rolling latency and success statistics for one webhook URL"""
+
+    def __init__(self, url, window=100, failure_threshold=3, reset_timeout=30.0):
+        self.url = url
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def record(self, ok, latency=None):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def success_rate(self):
+        if not self.outcomes:
+            return 1.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def score(self):
+        """Lower is better: median latency inflated by the recent failure rate"""
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return float('inf')
+        median = self.percentile(50) or 0.0
+        return (median + 0.05) / max(self.success_rate(), 0.01)
+
+    def snapshot(self):
+        return {
+            'url': self.url,
+            'state': self.breaker.state,
+            'success_rate': round(self.success_rate(), 3),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95)
+        }
+
+
+class EndpointSelector:
+    """Orders webhook endpoints by health, skipping ones with an open breaker"""
+
+    def __init__(self, urls, **health_options):
+        self.endpoints = [EndpointHealth(url, **health_options) for url in urls]
+
+    def candidates(self):
+        """Healthy endpoints, best first; configured order breaks ties"""
+        ranked = sorted(
+            enumerate(self.endpoints),
+            key=lambda item: (item[1].score(), item[0])
+        )
+        allowed = [endpoint for _, endpoint in ranked if endpoint.breaker.available()]
+        if allowed:
+            return allowed
+        # Everything is tripped - try whichever endpoint failed longest ago
+        return [min(self.endpoints, key=lambda e: e.breaker.opened_at)]
+
+    def snapshot(self):
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+class SkippyClient:
+    """Async pooled HTTP client shared by every handler of a front end"""
+
+    def __init__(self, urls=None, max_connections=50, max_per_host=10,
+                 max_keepalive=20, keepalive_expiry=30.0,
+                 connect_timeout=5.0, read_timeout=30.0,
+                 hedge=False, hedge_min_delay=0.5, hedge_default_delay=5.0,
+                 failure_threshold=3, reset_timeout=30.0,
+                 ollama_url=DEFAULT_OLLAMA_URL, model=DEFAULT_MODEL):
+        self.urls = list(urls or webhook_urls())
+        self.ollama_url = ollama_url.rstrip('/')
+        self.model = model
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # Hedging: fire the runner-up endpoint once the leader exceeds its p95.
+        # Off by default - a hedged chat can run the same n8n workflow twice,
+        # and home automation commands aren't idempotent
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+
+        self.selector = EndpointSelector(
+            self.urls,
+            failure_threshold=failure_threshold,
+            reset_timeout=reset_timeout
+        )
+        self.last_url = None
+
+        self._client = None
+        self._host_slots = {}
+
+    def _get_client(self):
+        """Create the underlying httpx client lazily, inside the running loop"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    self.read_timeout,
+                    connect=self.connect_timeout
+                ),
+                headers={"Content-Type": "application/json"}
+            )
+        return self._client
+
+    def _host_slot(self, url):
+        """Per-host semaphore so one slow backend can't take the whole pool"""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return slot
+
+    async def post_json(self, url, payload, timeout=None):
+        """POST a JSON payload and return the decoded JSON body, or None"""
+        client = self._get_client()
+        async with self._host_slot(url):
+            kwargs = {} if timeout is None else {'timeout': timeout}
+            response = await client.post(url, json=payload, **kwargs)
+
+        if response.status_code != 200:
+            logger.warning(f"Skippy webhook {url} returned {response.status_code}")
+            return None
+        return response.json()
+
+    async def _attempt(self, endpoint, payload):
+        """One request to one endpoint, recorded into its health stats"""
+        endpoint.breaker.begin()
+        start = time.monotonic()
+        try:
+            data = await self.post_json(endpoint.url, payload)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"Skippy webhook {endpoint.url} failed: {e}")
+            data = None
+        except asyncio.CancelledError:
+            # Lost a hedge race - says nothing about the endpoint's health
+            endpoint.breaker.abandon()
+            raise
+
+        endpoint.record(data is not None, time.monotonic() - start)
+        if data is None:
+            raise LookupError(endpoint.url)
+        return endpoint, data
+
+    def hedge_delay(self, endpoint):
+        """How long to wait on `endpoint` before hedging to the next one"""
+        p95 = endpoint.percentile(95)
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    async def _race(self, candidates, payload):
+        """Run candidates leader-first, hedging after the leader's p95 delay"""
+        pending = {}
+        queue = list(candidates)
+
+        def launch():
+            endpoint = queue.pop(0)
+            task = asyncio.ensure_future(self._attempt(endpoint, payload))
+            pending[task] = endpoint
+            return endpoint
+
+        try:
+            leader = launch()
+            while pending:
+                timeout = self.hedge_delay(leader) if (self.hedge and queue) else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Leader is slower than usual - hedge to the next endpoint
+                    logger.info(f"Hedging Skippy request to {queue[0].url}")
+                    leader = launch()
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        # Slower endpoints are cancelled (and abandoned) below:
+                        # being slow isn't the same as failing
+                        return task.result()
+
+                # Everything in flight failed outright - fall through immediately
+                if not pending and queue:
+                    leader = launch()
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def chat(self, message, context=None):
+        """Send a chat message to Skippy via the healthiest webhook endpoint
+
+        `context` (earlier turns of the conversation) travels in its own
+        field so n8n's router only looks at the current message.
+        """
+        payload = {"message": message}
+        if context:
+            payload["context"] = context
+
+        endpoint, data = await self._race(self.selector.candidates(), payload)
+        if data is None:
+            return None
+
+        self.last_url = endpoint.url
+        return data.get('response', 'No response from Skippy')
+
+    async def stream_chat(self, message, context=None):
+        """Yield Skippy's reply token by token straight from Ollama
+
+        n8n's workflow calls Ollama with "stream": false, so streaming skips
+        the webhook and talks to Ollama with the same personality prompt.
+        That also skips n8n's router: send `is_home_command` messages
+        through `chat()` instead.
+        """
+        client = self._get_client()
+        url = f"{self.ollama_url}/api/generate"
+        payload = {
+            "model": self.model,
+            "prompt": SKIPPY_PROMPT.format(
+                message=message,
+                history=f"Conversation so far:\n{context}\n\n" if context else ""
+            ),
+            "stream": True
+        }
+
+        async with self._host_slot(url):
+            async with client.stream("POST", url, json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        break
+
+    def health(self):
+        """Per-endpoint health snapshot (state, success rate, p50/p95)"""
+        return self.selector.snapshot()
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SyncSkippyClient:
+    """Blocking facade for the voice front ends
+
+    Runs a SkippyClient on a private event loop thread so its connection pool
+    and endpoint health survive between calls.
+    """
+
+    def __init__(self, **options):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.client = SkippyClient(**options)
+
+    @property
+    def last_url(self):
+        return self.client.last_url
+
+    def chat(self, message, context=None):
+        future = asyncio.run_coroutine_threadsafe(self.client.chat(message, context), self._loop)
+        return future.result()
+
+    def health(self):
+        return self.client.health()
+
+    def close(self):
+        future = asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# === BENCHMARK ===
+
+async def _start_fake_webhook(delay):
+    """Minimal keep-alive HTTP server that answers like n8n after `delay`"""
+    body = b'{"response": "Fine. Here is your answer, meat-sack."}'
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                headers = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in headers.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                await asyncio.sleep(delay)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\n'
+                    b'Content-Type: application/json\r\n'
+                    b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+                    b'\r\n' + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/webhook/skippy/chat"
+
+
+async def benchmark(chats=20, delay=0.5):
+    """Compare serial vs concurrent chats against a local fake webhook"""
+    server, url = await _start_fake_webhook(delay)
+    client = SkippyClient(urls=[url], max_per_host=chats)
+
+    try:
+        start = time.perf_counter()
+        for i in range(chats):
+            await client.chat(f"serial {i}")
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.chat(f"concurrent {i}") for i in range(chats)))
+        concurrent = time.perf_counter() - start
+    finally:
+        await client.aclose()
+        server.close()
+        await server.wait_closed()
+
+    print(f"📊 {chats} chats, {delay:.2f}s backend latency each")
+    print(f"   Serial:     {serial:.2f}s")
+    print(f"   Concurrent: {concurrent:.2f}s ({serial / concurrent:.1f}x faster)")
+    return serial, concurrent
+
+
+async def benchmark_hedging(requests=10, stall=10.0, delay=0.2):
+    """Primary webhook hangs, webhook-test is healthy: time to an answer"""
+    slow_server, slow_url = await _start_fake_webhook(stall)
+    fast_server, fast_url = await _start_fake_webhook(delay)
+    client = SkippyClient(urls=[slow_url, fast_url], hedge=True, hedge_default_delay=0.5,
+                          read_timeout=stall / 2, failure_threshold=1)
+
+    try:
+        timings = []
+        for i in range(requests):
+            start = time.perf_counter()
+            await client.chat(f"hedged {i}")
+            timings.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+        for server in (slow_server, fast_server):
+            server.close()
+
+    print(f"📊 {requests} requests with a stalled primary endpoint")
+    print(f"   First request: {timings[0]:.2f}s (hedged after the default delay)")
+    print(f"   Later average: {sum(timings[1:]) / max(1, len(timings) - 1):.2f}s")
+    for endpoint in client.health():
+        print(f"   {endpoint['url']}: {endpoint['state']}, "
+              f"success {endpoint['success_rate']:.0%}")
+    return timings
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
+    asyncio.run(benchmark_hedging())
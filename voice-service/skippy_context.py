@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Skippy Context
+Per-chat conversation memory for Skippy's backend requests
+
+Each chat keeps its recent turns in a fixed-size ring, trimmed to a token
+budget when rendered. Chats live in an LRU map bounded by a chat count and
+a global token cap, so memory stays flat however many chats the bot sees.
+"""
+
+import logging
+from collections import OrderedDict
+
+from skippy_summarize import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistory:
+    """Fixed-size ring of (speaker, text, tokens) turns"""
+
+    __slots__ = ('turns', 'start', 'count', 'tokens')
+
+    def __init__(self, size):
+        self.turns = [None] * size
+        self.start = 0
+        self.count = 0
+        self.tokens = 0
+
+    def append(self, turn):
+        """Add a turn, returning the one it overwrote (or None)"""
+        size = len(self.turns)
+        if self.count < size:
+            self.turns[(self.start + self.count) % size] = turn
+            self.count += 1
+            dropped = None
+        else:
+            dropped = self.turns[self.start]
+            self.turns[self.start] = turn
+            self.start = (self.start + 1) % size
+        self.tokens += turn[2] - (dropped[2] if dropped else 0)
+        return dropped
+
+    def newest_first(self):
+        size = len(self.turns)
+        for i in range(self.count - 1, -1, -1):
+            yield self.turns[(self.start + i) % size]
+
+
+class ConversationContext:
+    """Recent turns for every chat, bounded per chat and globally"""
+
+    def __init__(self, max_turns=20, token_budget=1500, max_chats=5000,
+                 max_total_tokens=2_000_000):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_chats = max_chats
+        self.max_total_tokens = max_total_tokens
+
+        self._chats = OrderedDict()   # chat_id -> ChatHistory, least recently used first
+        self.total_tokens = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._chats)
+
+    def add(self, chat_id, speaker, text):
+        """Record one turn for a chat"""
+        # A turn longer than the whole budget could never be rendered in full;
+        # clip it so it fits together with its speaker label
+        room = self.token_budget - estimate_tokens(speaker) - 1
+        text = text[:max(0, room) * CHARS_PER_TOKEN]
+        turn = (speaker, text, estimate_tokens(speaker) + estimate_tokens(text) + 1)
+
+        history = self._chats.get(chat_id)
+        if history is None:
+            history = self._chats[chat_id] = ChatHistory(self.max_turns)
+        else:
+            self._chats.move_to_end(chat_id)
+
+        dropped = history.append(turn)
+        self.total_tokens += turn[2] - (dropped[2] if dropped else 0)
+        self._evict()
+
+    def render(self, chat_id, budget=None):
+        """The most recent turns that fit in `budget` tokens, oldest first"""
+        history = self._chats.get(chat_id)
+        if history is None:
+            return ""
+        self._chats.move_to_end(chat_id)
+
+        budget = budget or self.token_budget
+        lines = []
+        used = 0
+        for speaker, text, tokens in history.newest_first():
+            if used + tokens > budget:
+                # Clip the turn that doesn't fit to its newest part and stop there
+                room = budget - used - estimate_tokens(speaker) - 1
+                if room > 0:
+                    lines.append(f"{speaker}: …{text[-(room * CHARS_PER_TOKEN - 1):]}")
+                break
+            lines.append(f"{speaker}: {text}")
+            used += tokens
+        lines.reverse()
+        return "\n".join(lines)
+
+    def clear(self, chat_id):
+        history = self._chats.pop(chat_id, None)
+        if history is not None:
+            self.total_tokens -= history.tokens
+
+    def _evict(self):
+        while self._chats and (len(self._chats) > self.max_chats
+                               or self.total_tokens > self.max_total_tokens):
+            chat_id, history = self._chats.popitem(last=False)
+            self.total_tokens -= history.tokens
+            self.evicted += 1
+            logger.debug(f"Evicted conversation context for idle chat {chat_id}")
+
+    def stats(self):
+        return {
+            'chats': len(self._chats),
+            'tokens': self.total_tokens,
+            'evicted': self.evicted
+        }
+
+
+def benchmark(chats=20000, turns_per_chat=30):
+    """Memory footprint and speed with far more chats than the cap"""
+    import time
+    import tracemalloc
+
+    def fill(context):
+        for chat_id in range(chats):
+            for turn in range(turns_per_chat):
+                context.add(chat_id, "Tester", f"Message {turn} in chat {chat_id}: what's the status of the build?")
+
+    context = ConversationContext()
+    start = time.perf_counter()
+    fill(context)
+    added = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for chat_id in range(chats - 1000, chats):
+        context.render(chat_id)
+    rendered = (time.perf_counter() - start) / 1000
+
+    tracemalloc.start()
+    fill(ConversationContext())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"📊 {chats} chats x {turns_per_chat} turns")
+    print(f"   Add:    {added / (chats * turns_per_chat) * 1e6:.1f}µs per turn")
+    print(f"   Render: {rendered * 1e6:.0f}µs per chat")
+    print(f"   Kept:   {context.stats()}")
+    print(f"   Peak:   {peak / 1024 / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    benchmark()
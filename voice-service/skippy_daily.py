@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Skippy Daily
+Batch planning for /daily updates
+
+Subscribers are grouped into delivery slots by HH:MM. Ahead of each slot
+the briefings are generated once per distinct variant, with bounded
+concurrency, and staged, so at delivery time every message goes out
+immediately instead of a burst of identical LLM requests at 09:00:00.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+
+class DailyBatchPlanner:
+    """Groups daily subscribers by time slot, pre-generates, then delivers"""
+
+    def __init__(self, scheduler, generate, deliver, lead_time=600, concurrency=2,
+                 delivery_wait=30.0):
+        self.scheduler = scheduler
+        self.generate = generate          # async (variant) -> text or None
+        self.deliver = deliver            # async (chat_id, user_name, text) -> None
+        self.lead_time = lead_time        # seconds of generation head start
+        self.delivery_wait = delivery_wait
+        self._generation_slots = asyncio.Semaphore(concurrency)
+
+        self.slots = {}                   # (hour, minute) -> {job_id: (chat_id, user_name, variant)}
+        self._staged = {}                 # (slot, variant) -> (date, text)
+        self._preparing = {}              # slot -> task
+
+        self.generated = 0
+        self.delivered = 0
+        self.shared = 0
+
+    # === SUBSCRIBERS ===
+
+    def add(self, job_id, hour, minute, chat_id, user_name, variant='default'):
+        self.remove(job_id)
+        slot = (hour, minute)
+        recipients = self.slots.setdefault(slot, {})
+        recipients[job_id] = (chat_id, user_name, variant)
+
+        if len(recipients) == 1:
+            prep_hour, prep_minute = divmod((hour * 60 + minute - self.lead_time // 60) % 1440, 60)
+            self.scheduler.schedule_daily(prep_hour, prep_minute, self.start_preparing, slot,
+                                          job_id=self._prep_id(slot))
+            self.scheduler.schedule_daily(hour, minute, self.deliver_slot, slot,
+                                          job_id=self._slot_id(slot))
+
+    def remove(self, job_id):
+        for slot, recipients in list(self.slots.items()):
+            if recipients.pop(job_id, None) is not None and not recipients:
+                del self.slots[slot]
+                self.scheduler.cancel(self._prep_id(slot))
+                self.scheduler.cancel(self._slot_id(slot))
+                for key in [key for key in self._staged if key[0] == slot]:
+                    del self._staged[key]
+
+    @staticmethod
+    def _prep_id(slot):
+        return f"daily_prep_{slot[0]:02d}:{slot[1]:02d}"
+
+    @staticmethod
+    def _slot_id(slot):
+        return f"daily_slot_{slot[0]:02d}:{slot[1]:02d}"
+
+    # === GENERATION ===
+
+    def start_preparing(self, slot):
+        """Scheduler callback; returns nothing so the scheduler doesn't wrap the task"""
+        self.prepare(slot)
+
+    def prepare(self, slot):
+        """Start generating a slot's briefings (one per distinct variant)"""
+        task = self._preparing.get(slot)
+        if task is None or task.done():
+            task = self._preparing[slot] = asyncio.get_running_loop().create_task(self._prepare(slot))
+        return task
+
+    async def _prepare(self, slot):
+        today = date.today()
+        variants = {variant for _, _, variant in self.slots.get(slot, {}).values()}
+        missing = [v for v in variants if self._staged.get((slot, v), (None,))[0] != today]
+
+        async def generate(variant):
+            async with self._generation_slots:
+                try:
+                    text = await self.generate(variant)
+                except Exception as e:
+                    logger.error(f"Daily briefing generation failed for {variant}: {e}")
+                    text = None
+            self._staged[(slot, variant)] = (today, text)
+            self.generated += 1
+
+        start = time.monotonic()
+        await asyncio.gather(*(generate(variant) for variant in missing))
+        logger.info(
+            f"Prepared {len(missing)} daily briefing(s) for {len(self.slots.get(slot, {}))} "
+            f"subscribers at {slot[0]:02d}:{slot[1]:02d} in {time.monotonic() - start:.1f}s"
+        )
+
+    # === DELIVERY ===
+
+    async def deliver_slot(self, slot):
+        recipients = list(self.slots.get(slot, {}).values())
+        if not recipients:
+            return
+
+        # Normally long finished; covers slots added inside the lead time
+        try:
+            await asyncio.wait_for(asyncio.shield(self.prepare(slot)), self.delivery_wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"Daily briefings for {slot[0]:02d}:{slot[1]:02d} not ready, sending without")
+
+        today = date.today()
+        variants_used = set()
+
+        async def send(chat_id, user_name, variant):
+            staged_day, text = self._staged.get((slot, variant), (None, None))
+            if staged_day != today:
+                text = None
+            if variant in variants_used:
+                self.shared += 1
+            variants_used.add(variant)
+            try:
+                await self.deliver(chat_id, user_name, text)
+                self.delivered += 1
+            except Exception as e:
+                logger.error(f"Daily update to {chat_id} failed: {e}")
+
+        await asyncio.gather(*(send(*recipient) for recipient in recipients))
+
+    def stats(self):
+        return {
+            'slots': len(self.slots),
+            'subscribers': sum(len(r) for r in self.slots.values()),
+            'generated': self.generated,
+            'delivered': self.delivered,
+            'shared': self.shared
+        }
+
+
+def benchmark(subscribers=200, generation_time=0.5):
+    """Everyone at 09:00: one LLM call per user vs one per distinct variant"""
+
+    class _NullScheduler:
+        def schedule_daily(self, *args, **kwargs):
+            pass
+
+        def cancel(self, job_id):
+            pass
+
+    calls = 0
+
+    async def generate(variant):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(generation_time)   # Ollama serves one request at a time
+        return f"Today's briefing ({variant})"
+
+    async def run():
+        latencies = []
+
+        async def deliver(chat_id, user_name, text):
+            latencies.append(time.monotonic() - due)
+
+        planner = DailyBatchPlanner(_NullScheduler(), generate, deliver)
+        for i in range(subscribers):
+            planner.add(f"daily_{i}", 9, 0, i, f"User {i}", variant=('default', 'terse')[i % 2])
+
+        await planner.prepare((9, 0))          # runs lead_time before the slot
+        due = time.monotonic()
+        await planner.deliver_slot((9, 0))
+        return latencies, planner.stats()
+
+    latencies, stats = asyncio.run(run())
+    naive = subscribers * generation_time
+    print(f"📊 {subscribers} subscribers at 09:00, {generation_time}s per serialized generation")
+    print(f"   Per-user generation: {subscribers} LLM calls, last message ~{naive:.0f}s late")
+    print(f"   Batched:             {calls} LLM calls, last message {max(latencies) * 1000:.1f}ms late")
+    print(f"   Stats: {stats}")
+
+
+if __name__ == "__main__":
+    benchmark()
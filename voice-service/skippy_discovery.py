@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Skippy Discovery
+Finds Philips Hue bridges with SSDP and mDNS instead of sweeping IPs
+
+One SSDP M-SEARCH and one mDNS `_hue._tcp.local` query go out together and
+every answer that arrives within the listen window is collected. Bridges
+are deduplicated by bridge id, so a bridge answering both protocols shows
+up once, and any number of bridges anywhere on the LAN are found.
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SSDP_ADDR = ("239.255.255.250", 1900)
+MDNS_ADDR = ("224.0.0.251", 5353)
+HUE_SERVICE = "_hue._tcp.local"
+
+DNS_A, DNS_PTR, DNS_TXT, DNS_SRV = 1, 12, 16, 33
+QU_BIT = 0x8000   # "unicast response please" in the question class
+
+
+# === SSDP ===
+
+def ssdp_search(mx=1, st="urn:schemas-upnp-org:device:basic:1"):
+    return (
+        "M-SEARCH * HTTP/1.1\r\n"
+        f"HOST: {SSDP_ADDR[0]}:{SSDP_ADDR[1]}\r\n"
+        'MAN: "ssdp:discover"\r\n'
+        f"MX: {mx}\r\n"
+        f"ST: {st}\r\n"
+        "\r\n"
+    ).encode()
+
+
+def parse_ssdp(data, address):
+    """Return a bridge dict if this SSDP response came from a Hue bridge"""
+    lines = data.decode('latin-1').split("\r\n")
+    if not lines or not lines[0].startswith("HTTP/1.1 200"):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition(":")
+        if sep:
+            headers[key.strip().lower()] = value.strip()
+
+    # Hue bridges add hue-bridgeid; older firmware only says IpBridge in SERVER
+    bridge_id = headers.get('hue-bridgeid')
+    if not bridge_id and 'IpBridge' not in headers.get('server', ''):
+        return None
+    # LOCATION names the bridge itself even if the answer was relayed
+    location = headers.get('location')
+    ip = urlparse(location).hostname if location else None
+    ip = ip or address[0]
+    return {
+        'id': (bridge_id or ip).lower(),
+        'ip': ip,
+        'port': 80,
+        'name': None,
+        'source': 'ssdp',
+        'location': location
+    }
+
+
+# === mDNS ===
+
+def _encode_name(name):
+    return b''.join(bytes([len(label)]) + label.encode() for label in name.split('.') if label) + b'\0'
+
+
+def mdns_query(service=HUE_SERVICE):
+    """PTR question for the service, asking for unicast replies"""
+    header = struct.pack("!HHHHHH", 0, 0, 1, 0, 0, 0)
+    return header + _encode_name(service) + struct.pack("!HH", DNS_PTR, 1 | QU_BIT)
+
+
+def _read_name(data, offset):
+    labels = []
+    end = None
+    for _ in range(128):   # bounds compression-pointer loops
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('utf-8', 'replace'))
+        offset += length
+    return '.'.join(labels), (end if end is not None else offset)
+
+
+def parse_dns(data):
+    """Return (name, type, value) for every answer/authority/additional record"""
+    _, _, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+
+    records = []
+    for _ in range(ancount + nscount + arcount):
+        name, offset = _read_name(data, offset)
+        rtype, _, _, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata = data[offset:offset + rdlength]
+        if rtype == DNS_PTR:
+            value = _read_name(data, offset)[0]
+        elif rtype == DNS_SRV:
+            _, _, port = struct.unpack("!HHH", rdata[:6])
+            value = (_read_name(data, offset + 6)[0], port)
+        elif rtype == DNS_TXT:
+            value, i = {}, 0
+            while i < len(rdata):
+                entry = rdata[i + 1:i + 1 + rdata[i]].decode('utf-8', 'replace')
+                key, _, val = entry.partition('=')
+                value[key.lower()] = val
+                i += 1 + rdata[i]
+        elif rtype == DNS_A and rdlength == 4:
+            value = socket.inet_ntoa(rdata)
+        else:
+            value = None
+        records.append((name.lower(), rtype, value))
+        offset += rdlength
+    return records
+
+
+def parse_mdns(data, address, service=HUE_SERVICE):
+    """Return bridge dicts for every service instance in an mDNS response"""
+    try:
+        records = parse_dns(data)
+    except (struct.error, IndexError):
+        return []
+
+    instances = [value for name, rtype, value in records if rtype == DNS_PTR and name == service.lower()]
+    srv = {name: value for name, rtype, value in records if rtype == DNS_SRV}
+    txt = {name: value for name, rtype, value in records if rtype == DNS_TXT}
+    hosts = {name: value for name, rtype, value in records if rtype == DNS_A}
+
+    bridges = []
+    for instance in instances:
+        key = instance.lower()
+        target, port = srv.get(key, (None, 80))
+        ip = hosts.get((target or '').lower(), address[0])
+        properties = txt.get(key, {})
+        bridges.append({
+            'id': (properties.get('bridgeid') or ip).lower(),
+            'ip': ip,
+            'port': port,
+            'name': instance.split('.')[0],
+            'source': 'mdns',
+            'model': properties.get('modelid')
+        })
+    return bridges
+
+
+# === DISCOVERY ===
+
+class _Collector(asyncio.DatagramProtocol):
+    def __init__(self, parse, found):
+        self.parse = parse
+        self.found = found
+
+    def datagram_received(self, data, address):
+        try:
+            bridges = self.parse(data, address)
+        except (UnicodeDecodeError, ValueError):
+            return
+        for bridge in ([bridges] if isinstance(bridges, dict) else bridges or []):
+            known = self.found.get(bridge['id'])
+            if known is None:
+                self.found[bridge['id']] = bridge
+                logger.info(f"Hue bridge {bridge['id']} at {bridge['ip']} ({bridge['source']})")
+            else:
+                # Answered both ways: keep the first, fill in what the other knew
+                for field, value in bridge.items():
+                    if known.get(field) is None:
+                        known[field] = value
+
+
+def _multicast_socket():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+    sock.bind(('', 0))
+    sock.setblocking(False)
+    return sock
+
+
+async def discover_bridges(window=1.5, ssdp_addr=SSDP_ADDR, mdns_addr=MDNS_ADDR):
+    """Send SSDP and mDNS queries together; return every bridge that answers within `window`"""
+    loop = asyncio.get_running_loop()
+    found = {}
+    transports = []
+    probes = ((ssdp_addr, ssdp_search(mx=max(1, int(window))), parse_ssdp),
+              (mdns_addr, mdns_query(), parse_mdns))
+    try:
+        for address, query, parse in probes:
+            if address is None:
+                continue
+            try:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda parse=parse: _Collector(parse, found), sock=_multicast_socket())
+            except OSError as e:
+                logger.warning(f"Can't open discovery socket: {e}")
+                continue
+            transports.append((transport, query, address))
+
+        # Send twice: UDP multicast on Wi-Fi loses packets
+        for attempt in range(2):
+            for transport, query, address in transports:
+                try:
+                    transport.sendto(query, address)
+                except OSError as e:
+                    logger.debug(f"Discovery query to {address} failed: {e}")
+            await asyncio.sleep(window / 2)
+    finally:
+        for transport, _, _ in transports:
+            transport.close()
+    return list(found.values())
+
+
+def find_bridges(window=1.5, **addresses):
+    """Blocking wrapper for callers outside an event loop"""
+    return asyncio.run(discover_bridges(window, **addresses))
+
+
+# === TEST STAND-IN ===
+
+class FakeBridgeResponder(asyncio.DatagramProtocol):
+    """Answers SSDP M-SEARCH and mDNS _hue._tcp queries like a set of bridges would"""
+
+    def __init__(self, bridges):
+        self.bridges = bridges   # list of {'id', 'ip', 'name'}
+        self.transport = None
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.queries += 1
+        if data.startswith(b"M-SEARCH"):
+            for bridge in self.bridges:
+                self.transport.sendto(self.ssdp_response(bridge), address)
+        else:
+            self.transport.sendto(self.mdns_response(), address)
+
+    @staticmethod
+    def ssdp_response(bridge):
+        return (
+            "HTTP/1.1 200 OK\r\n"
+            "CACHE-CONTROL: max-age=100\r\n"
+            f"LOCATION: http://{bridge['ip']}:80/description.xml\r\n"
+            "SERVER: Linux/3.14.0 UPnP/1.0 IpBridge/1.56.0\r\n"
+            f"hue-bridgeid: {bridge['id'].upper()}\r\n"
+            "ST: urn:schemas-upnp-org:device:basic:1\r\n"
+            "\r\n"
+        ).encode()
+
+    def mdns_response(self):
+        records = []
+        for bridge in self.bridges:
+            instance = f"{bridge['name']}.{HUE_SERVICE}"
+            host = f"{bridge['name'].replace(' ', '-')}.local"
+            txt = b''.join(bytes([len(e)]) + e for e in (f"bridgeid={bridge['id']}".encode(), b"modelid=BSB002"))
+            records += [
+                (HUE_SERVICE, DNS_PTR, _encode_name(instance)),
+                (instance, DNS_SRV, struct.pack("!HHH", 0, 0, 443) + _encode_name(host)),
+                (instance, DNS_TXT, txt),
+                (host, DNS_A, socket.inet_aton(bridge['ip']))
+            ]
+        answers = b''.join(
+            _encode_name(name) + struct.pack("!HHIH", rtype, 1, 120, len(rdata)) + rdata
+            for name, rtype, rdata in records
+        )
+        return struct.pack("!HHHHHH", 0, 0x8400, 0, len(records), 0, 0) + answers
+
+
+async def start_fake_responder(bridges, host="127.0.0.1"):
+    loop = asyncio.get_running_loop()
+    transport, responder = await loop.create_datagram_endpoint(
+        lambda: FakeBridgeResponder(bridges), local_addr=(host, 0))
+    return transport, responder
+
+
+def benchmark(bridges=3, window=1.0):
+    """Find several fake bridges through a local SSDP/mDNS responder"""
+    fakes = [{'id': f"001788fffe00{i:04x}", 'ip': f"192.168.{i}.{200 + i}", 'name': f"Hue Bridge {i}"}
+             for i in range(bridges)]
+
+    async def run():
+        ssdp_transport, _ = await start_fake_responder(fakes[:-1])   # last bridge only speaks mDNS
+        mdns_transport, _ = await start_fake_responder(fakes)
+        start = time.perf_counter()
+        found = await discover_bridges(window, ssdp_addr=ssdp_transport.get_extra_info('sockname'),
+                                       mdns_addr=mdns_transport.get_extra_info('sockname'))
+        elapsed = time.perf_counter() - start
+        ssdp_transport.close()
+        mdns_transport.close()
+        return found, elapsed
+
+    found, elapsed = asyncio.run(run())
+    expected = {fake['id'] for fake in fakes}
+    print(f"📊 {bridges} bridges on scattered subnets, {window}s listen window")
+    print(f"   Found {len(found)} in {elapsed:.2f}s, all expected: {expected == {b['id'] for b in found}}")
+    for bridge in found:
+        print(f"   {bridge['id']} {bridge['ip']}:{bridge['port']} via {bridge['source']} ({bridge['name']})")
+    print("   Old sweep: .1-.20 only, 5s budget, first bridge only")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    benchmark()
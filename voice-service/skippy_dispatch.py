@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Skippy Dispatch
+Concurrent Telegram update processing with strict per-chat ordering
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# The base class semaphore is only used as a formality; the real global cap is
+# applied after an update reaches the head of its chat's queue, so a busy chat
+# never holds slots that other chats could use.
+_UNBOUNDED = 2 ** 31 - 1
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from different chats concurrently, one at a time per chat"""
+
+    def __init__(self, max_concurrent_updates=16, wait_window=500):
+        super().__init__(_UNBOUNDED)
+        self.concurrency_limit = max_concurrent_updates
+        self._slots = None
+        self._tails = {}
+        self._depth = {}
+
+        # Metrics
+        self.queued = 0
+        self.running = 0
+        self.processed = 0
+        self.max_queue_depth = 0
+        self.wait_times = deque(maxlen=wait_window)
+
+    async def initialize(self):
+        self._slots = asyncio.Semaphore(self.concurrency_limit)
+
+    async def shutdown(self):
+        self._tails.clear()
+        self._depth.clear()
+
+    @staticmethod
+    def chat_key(update):
+        """Updates are ordered per chat; anything without a chat is unordered"""
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        if self._slots is None:
+            await self.initialize()
+
+        key = self.chat_key(update)
+        enqueued_at = time.monotonic()
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        # Chain behind the previous update from the same chat
+        previous = self._tails.get(key) if key is not None else None
+        turn = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self._tails[key] = turn
+            self._depth[key] = self._depth.get(key, 0) + 1
+
+        started = False
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            async with self._slots:
+                started = True
+                self.queued -= 1
+                self.running += 1
+                self.wait_times.append(time.monotonic() - enqueued_at)
+                try:
+                    await coroutine
+                finally:
+                    self.running -= 1
+                    self.processed += 1
+        finally:
+            if not started:
+                self.queued -= 1
+            if not turn.done():
+                turn.set_result(None)
+            if key is not None:
+                self._depth[key] -= 1
+                if self._depth[key] == 0:
+                    del self._depth[key]
+                if self._tails.get(key) is turn:
+                    del self._tails[key]
+
+    def stats(self):
+        """Queue depth and wait time snapshot for sizing the concurrency cap"""
+        waits = sorted(self.wait_times)
+        if waits:
+            avg_wait = sum(waits) / len(waits)
+            p95_wait = waits[min(len(waits) - 1, int(0.95 * len(waits)))]
+        else:
+            avg_wait = p95_wait = 0.0
+
+        return {
+            'concurrency_limit': self.concurrency_limit,
+            'running': self.running,
+            'queued': self.queued,
+            'max_queue_depth': self.max_queue_depth,
+            'busiest_chat_depth': max(self._depth.values(), default=0),
+            'processed': self.processed,
+            'avg_wait': avg_wait,
+            'p95_wait': p95_wait
+        }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Skippy Document Cache
+Content-addressed on-disk cache for extracted document text and analyses
+
+Entries are stored per SHA-256 of the file content, so the same document
+forwarded under different Telegram file ids is only processed once. Small
+alias files map a Telegram file_unique_id to its content hash, which lets a
+re-forwarded file be answered without downloading it again. The cache is
+bounded by total size (least recently used entries go first) and by age.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+ENTRY_SUFFIX = '.json.gz'
+ALIAS_SUFFIX = '.alias'
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Size-bounded LRU cache with TTL, keyed by content hash"""
+
+    def __init__(self, directory="skippy_doc_cache", max_bytes=256 * 1024 * 1024,
+                 ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()   # content hash -> size on disk, LRU order
+        self._aliases = {}              # file_unique_id -> content hash
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    # === INDEX ===
+
+    def _entry_path(self, content_hash):
+        return os.path.join(self.directory, content_hash + ENTRY_SUFFIX)
+
+    def _alias_path(self, file_unique_id):
+        return os.path.join(self.directory, file_unique_id + ALIAS_SUFFIX)
+
+    def _scan(self):
+        """Rebuild the LRU index from disk, oldest access first"""
+        entries = []
+        for item in os.scandir(self.directory):
+            if item.name.endswith(ENTRY_SUFFIX):
+                stat = item.stat()
+                entries.append((stat.st_mtime, item.name[:-len(ENTRY_SUFFIX)], stat.st_size))
+            elif item.name.endswith(ALIAS_SUFFIX):
+                with open(item.path) as f:
+                    self._aliases[item.name[:-len(ALIAS_SUFFIX)]] = f.read().strip()
+
+        for _, content_hash, size in sorted(entries):
+            self._entries[content_hash] = size
+            self._size += size
+
+        logger.info(f"Document cache: {len(self._entries)} entries, {self._size / 1024 / 1024:.1f}MB")
+
+    def _forget(self, content_hash):
+        size = self._entries.pop(content_hash, None)
+        if size is not None:
+            self._size -= size
+        stale = [uid for uid, target in self._aliases.items() if target == content_hash]
+        for uid in stale:
+            del self._aliases[uid]
+        for path in [self._entry_path(content_hash)] + [self._alias_path(uid) for uid in stale]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            content_hash = next(iter(self._entries))
+            logger.info(f"Evicting cached document {content_hash[:12]}")
+            self._forget(content_hash)
+
+    # === FILE I/O (runs in a worker thread) ===
+
+    def _read(self, content_hash):
+        path = self._entry_path(content_hash)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {content_hash[:12]}: {e}")
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl:
+            return None
+        os.utime(path)  # mtime doubles as last-access time across restarts
+        return entry
+
+    def _write(self, content_hash, entry):
+        path = self._entry_path(content_hash)
+        temp = path + '.tmp'
+        with gzip.open(temp, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(entry, f, separators=(',', ':'))
+        os.replace(temp, path)
+        return os.path.getsize(path)
+
+    def _write_alias(self, file_unique_id, content_hash):
+        with open(self._alias_path(file_unique_id), 'w') as f:
+            f.write(content_hash)
+
+    # === PUBLIC API ===
+
+    async def hash_file(self, path):
+        return await asyncio.to_thread(hash_file, path)
+
+    async def lookup(self, file_unique_id):
+        """Entry for a Telegram file we've seen before, without downloading it"""
+        content_hash = self._aliases.get(file_unique_id)
+        if content_hash is None:
+            return None
+        return await self.get(content_hash)
+
+    async def get(self, content_hash):
+        if content_hash not in self._entries:
+            self.misses += 1
+            return None
+
+        entry = await asyncio.to_thread(self._read, content_hash)
+        if entry is None:
+            self._forget(content_hash)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(content_hash)
+        self.hits += 1
+        return entry
+
+    async def put(self, content_hash, file_unique_id=None, **fields):
+        """Merge `fields` (e.g. text=..., analysis=...) into the entry"""
+        if fields or content_hash not in self._entries:
+            entry = None
+            if content_hash in self._entries:
+                entry = await asyncio.to_thread(self._read, content_hash)
+            entry = entry or {'created': time.time()}
+            entry.update(fields)
+
+            size = await asyncio.to_thread(self._write, content_hash, entry)
+            self._size += size - self._entries.pop(content_hash, 0)
+            self._entries[content_hash] = size
+
+        if file_unique_id and self._aliases.get(file_unique_id) != content_hash:
+            self._aliases[file_unique_id] = content_hash
+            await asyncio.to_thread(self._write_alias, file_unique_id, content_hash)
+
+        self._evict()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
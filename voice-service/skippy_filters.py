@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Skippy Filters
+Handler-level pre-filter for group traffic
+
+Runs as part of the MessageHandler's filter, so messages in groups that
+aren't enabled, or that don't mention the bot, are dropped before any
+handler code runs. The mention check is a precomputed lowercase substring
+test, confirmed against the message entities only when it matches.
+"""
+
+import logging
+from collections import Counter
+
+from telegram import MessageEntity
+from telegram.ext import filters
+
+logger = logging.getLogger(__name__)
+
+GROUP_CHAT_TYPES = frozenset(('group', 'supergroup'))
+
+
+class AddressedToSkippy(filters.MessageFilter):
+    """Passes private messages, and group messages that mention the bot in an enabled group"""
+
+    def __init__(self, allowed_groups, user_allowlists=None):
+        super().__init__(name="AddressedToSkippy")
+        self.allowed_groups = allowed_groups        # live set, shared with the bot
+        # chat_id -> user ids allowed there; live dict, shared with the bot
+        self.user_allowlists = user_allowlists if user_allowlists is not None else {}
+        self.bot_id = None
+        self.mention = None
+
+        self.passed = 0
+        self.dropped = Counter()
+
+    def configure(self, bot):
+        """Precompute the mention once the bot's username is known (after initialize)"""
+        self.bot_id = bot.id
+        self.mention = f"@{bot.username}".lower()
+        logger.info(f"Group pre-filter listening for {self.mention}")
+
+    def filter(self, message):
+        chat = message.chat
+        if chat.type not in GROUP_CHAT_TYPES:
+            self.passed += 1
+            return True
+
+        if chat.id not in self.allowed_groups:
+            return self._drop('group_not_enabled')
+
+        allowlist = self.user_allowlists.get(chat.id)
+        if allowlist is not None and (message.from_user is None or message.from_user.id not in allowlist):
+            return self._drop('user_not_allowed')
+
+        if not self._mentioned(message):
+            return self._drop('not_mentioned')
+
+        self.passed += 1
+        return True
+
+    def _mentioned(self, message):
+        text = message.text or ""
+        entities = message.entities
+
+        # Cheap rejection for the common case: no '@bot' anywhere and no text_mention
+        if self.mention is None or (
+                self.mention not in text.lower()
+                and not any(e.type == MessageEntity.TEXT_MENTION for e in entities)):
+            return False
+
+        for entity, value in message.parse_entities(
+                [MessageEntity.MENTION, MessageEntity.TEXT_MENTION]).items():
+            if entity.type == MessageEntity.TEXT_MENTION:
+                if entity.user and entity.user.id == self.bot_id:
+                    return True
+            elif value.lower() == self.mention:
+                return True
+
+        # Entities missing (e.g. forwarded text) - fall back to the substring match
+        return not entities
+
+    def _drop(self, reason):
+        self.dropped[reason] += 1
+        return False
+
+    def stats(self):
+        return {
+            'passed': self.passed,
+            'dropped': sum(self.dropped.values()),
+            'reasons': dict(self.dropped)
+        }
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Skippy Health
+Background health prober for Skippy's backends (n8n, Ollama, Postgres, Redis)
+
+Probes run concurrently on a fixed interval and land in an in-memory
+snapshot with an hour of history, so /status renders instantly instead of
+waiting on a dead backend's timeout.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from skippy_client import DEFAULT_OLLAMA_URL
+
+logger = logging.getLogger(__name__)
+
+SKIPPY_HOST = "192.168.0.229"
+
+
+# === PROBES ===
+
+class HTTPProbe:
+    """Healthy when GET `url` answers below 500"""
+
+    def __init__(self, url):
+        self.url = url
+        self.target = url
+
+    async def check(self, client, timeout):
+        response = await client.get(self.url, timeout=timeout)
+        return response.status_code < 500
+
+
+class TCPProbe:
+    """Connects, optionally sends `request`, and checks the reply prefix"""
+
+    def __init__(self, host, port, request=None, expect=None):
+        self.host = host
+        self.port = port
+        self.request = request
+        self.expect = expect
+        self.target = f"{host}:{port}"
+
+    async def check(self, client, timeout):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout)
+        try:
+            if self.request is None:
+                return True
+            writer.write(self.request)
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.read(64), timeout)
+            return any(reply.startswith(prefix) for prefix in self.expect)
+        finally:
+            writer.close()
+
+
+def redis_probe(host=SKIPPY_HOST, port=6379):
+    # +PONG, or an auth error - either way Redis itself is up
+    return TCPProbe(host, port, b"PING\r\n", (b"+PONG", b"-NOAUTH", b"-ERR"))
+
+
+def postgres_probe(host=SKIPPY_HOST, port=5432):
+    # SSLRequest: Postgres answers a single 'S' or 'N' byte without needing credentials
+    return TCPProbe(host, port, b"\x00\x00\x00\x08\x04\xd2\x16\x2f", (b"S", b"N"))
+
+
+def default_probes():
+    return {
+        'n8n': HTTPProbe(f"http://{SKIPPY_HOST}:5678/"),
+        'ollama': HTTPProbe(f"{DEFAULT_OLLAMA_URL}/api/tags"),
+        'postgres': postgres_probe(),
+        'redis': redis_probe()
+    }
+
+
+# === PROBER ===
+
+class HealthProber:
+    """Periodically probes every backend; snapshot() never touches the network"""
+
+    def __init__(self, probes=None, interval=30.0, timeout=3.0, window=3600.0):
+        self.probes = probes or default_probes()
+        self.interval = interval
+        self.timeout = timeout
+        self.window = window
+
+        self.history = {name: deque() for name in self.probes}   # (time, ok, latency)
+        self.last_error = {}
+        self.rounds = 0
+        self._client = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        """Probe every backend concurrently (a round takes at most `timeout`)"""
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        await asyncio.gather(*(self._probe(name, probe) for name, probe in self.probes.items()))
+        self.rounds += 1
+
+    async def _probe(self, name, probe):
+        start = time.monotonic()
+        try:
+            ok = await asyncio.wait_for(probe.check(self._client, self.timeout), self.timeout)
+            error = None if ok else "unexpected reply"
+        except Exception as e:
+            ok = False
+            error = str(e) or type(e).__name__
+        now = time.monotonic()
+
+        history = self.history[name]
+        history.append((now, ok, now - start))
+        while history and now - history[0][0] > self.window:
+            history.popleft()
+
+        if error:
+            self.last_error[name] = error
+            logger.debug(f"Health probe {name} failed: {error}")
+        else:
+            self.last_error.pop(name, None)
+
+    # === SNAPSHOT ===
+
+    def snapshot(self):
+        """{backend: {'online', 'latency', 'p50', 'p95', 'uptime', 'age'}}"""
+        now = time.monotonic()
+        snapshot = {}
+        for name, history in self.history.items():
+            if not history:
+                snapshot[name] = {'online': None}
+                continue
+            checked_at, online, latency = history[-1]
+            latencies = sorted(sample[2] for sample in history if sample[1])
+            snapshot[name] = {
+                'online': online,
+                'latency': latency,
+                'p50': _percentile(latencies, 0.50),
+                'p95': _percentile(latencies, 0.95),
+                'uptime': sum(1 for sample in history if sample[1]) / len(history),
+                'age': now - checked_at,
+                'error': self.last_error.get(name)
+            }
+        return snapshot
+
+    def status_line(self, name):
+        """One Markdown-friendly line for /status"""
+        info = self.snapshot().get(name, {'online': None})
+        if info['online'] is None:
+            return "⏳ Checking..."
+        if not info['online']:
+            return f"❌ Offline (uptime {info['uptime'] * 100:.0f}% last hour)"
+        if info['p50'] is None:
+            return "✅ Online"
+        return (
+            f"✅ Online, p50 {info['p50'] * 1000:.0f}ms / p95 {info['p95'] * 1000:.0f}ms "
+            f"(uptime {info['uptime'] * 100:.0f}%)"
+        )
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
@@ -5,6 +5,7 @@ Controls smart home devices with Skippy's personality
 """
 
 import json
+import os
 import requests
 import asyncio
 import logging
@@ -15,6 +16,12 @@ import platform
 import threading
 import time as time_module
 
+from skippy_discovery import find_bridges
+from skippy_hue import COLOR_XY, HueDispatcher
+from skippy_inventory import DeviceInventory
+from skippy_netscan import NetworkScanner, local_ip, parse_networks
+from skippy_registry import DeviceRegistry
+
 # Smart home integrations
 try:
     import paho.mqtt.client as mqtt
@@ -33,45 +40,118 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Common smart device ports and what usually listens there
+DEVICE_SIGNATURES = {
+    80: 'web',
+    8080: 'web',
+    1883: 'mqtt',
+    502: 'modbus',
+    6053: 'esphome'
+}
+
 class SkippyHomeAutomation:
-    def __init__(self):
-        self.devices = {}
+    def __init__(self, inventory_path="skippy_devices.json", platforms=None,
+                 scan_networks=None, background=True):
+        self.devices = DeviceRegistry()
         self.scenes = {}
         self.automations = {}
+        self.media_state = {}   # last volume set, so scenes can skip no-op changes
         
         # Initialize integrations
         self.hue_bridge = None
+        self.hue_bridges = {}   # bridge id -> phue Bridge
+        self.hue_dispatchers = {}   # bridge id -> HueDispatcher (fast REST path)
         self.mqtt_client = None
         
-        # Device discovery
-        self.discover_devices()
+        # Device discovery: start from the cache, rescan stale platforms in the background
+        self.platforms = self.default_platforms() if platforms is None else platforms
+        self.scan_networks = scan_networks
+        self.inventory = DeviceInventory(inventory_path)
+        self.discovery_done = threading.Event()
+        self.discovery_seconds = None
         
-        logger.info("Skippy Home Automation initialized")
-    
-    def discover_devices(self):
-        """Discover smart home devices on network"""
-        print("🔍 Discovering smart home devices...")
-        
-        # Quick option to skip Hue discovery
-        print("🤔 Skip Hue discovery for faster startup? (y/n)")
-        skip_hue = input("Skip Hue? [y/n]: ").strip().lower()
-        
-        if skip_hue != 'y':
-            # Discover Philips Hue
-            if PHILIPS_HUE_AVAILABLE:
-                self.discover_hue_bridge()
-        else:
-            print("⏭️  Skipping Hue discovery")
+        start = time_module.perf_counter()
+        self.discover_devices(background)
+        self.startup_seconds = time_module.perf_counter() - start
         
-        # Add virtual/mock devices for testing if no real devices found
-        if len(self.devices) == 0:
-            print("🔧 No physical devices found - adding virtual devices for testing")
-            self.add_virtual_devices()
+        logger.info(f"Skippy Home Automation initialized in {self.startup_seconds * 1000:.0f}ms "
+                    f"with {len(self.devices)} devices")
+    
+    @staticmethod
+    def default_platforms():
+        """Platforms to discover; SKIPPY_SKIP_HUE=1 replaces the old startup prompt"""
+        platforms = []
+        if PHILIPS_HUE_AVAILABLE and os.getenv('SKIPPY_SKIP_HUE', '').lower() not in ('1', 'y', 'yes', 'true'):
+            platforms.append('hue')
+        platforms.append('network')
+        return platforms
+    
+    def discover_devices(self, background=True):
+        """Load cached devices, then rediscover stale platforms (in a thread unless background=False)"""
+        warm = self.inventory.load()
+        for device_id, data in self.inventory.devices().items():
+            self.devices.update(device_id, data)
+        self._update_virtual_devices()
         
-        # Discover other devices
-        self.discover_network_devices()
+        stale = self.inventory.stale(self.platforms)
+        if warm:
+            print(f"⚡ Loaded {len(self.devices)} devices from cache"
+                  + (f" - refreshing {', '.join(stale)}" if stale else ""))
+        else:
+            print("🔍 No device cache yet - discovering smart home devices...")
         
-        print(f"✅ Found {len(self.devices)} devices")
+        if not stale:
+            self.discovery_done.set()
+        elif background:
+            threading.Thread(target=self.refresh_devices, args=(stale,),
+                             name="skippy-discovery", daemon=True).start()
+        else:
+            self.refresh_devices(stale)
+    
+    def refresh_devices(self, platforms=None):
+        """Rescan platforms and reconcile the inventory incrementally"""
+        scanners = {
+            'hue': self.discover_hue_bridge,
+            'network': self.discover_network_devices
+        }
+        start = time_module.perf_counter()
+        try:
+            for platform_name in platforms or self.platforms:
+                try:
+                    found = scanners[platform_name]()
+                except Exception as e:
+                    logger.error(f"{platform_name} discovery failed: {e}")
+                    found = None
+                if found is None:
+                    continue   # keep what the cache had
+                
+                added, removed, changed = self.inventory.update(platform_name, found)
+                for device_id in removed:
+                    self.devices.remove(device_id)
+                for device_id, data in found.items():
+                    self.devices.update(device_id, data)   # keeps last known on/off, brightness...
+                self._update_virtual_devices()
+                
+                if added or removed or changed:
+                    print(f"🔄 {platform_name}: +{len(added)} -{len(removed)} ~{len(changed)} devices")
+            
+            self.inventory.save()
+        finally:
+            self.discovery_seconds = time_module.perf_counter() - start
+            self.discovery_done.set()
+        print(f"✅ Discovery finished in {self.discovery_seconds:.1f}s - {len(self.devices)} devices")
+    
+    def _update_virtual_devices(self):
+        """Virtual devices stand in only while there are no real lights"""
+        has_physical = bool(self.devices.resolve(platform='hue'))
+        virtual = self.devices.resolve(platform='virtual')
+        if has_physical:
+            for device in virtual:
+                self.devices.remove(device.device_id)
+        elif not virtual:
+            # Add virtual/mock devices for testing if no real devices found
+            for device_id, data in self.add_virtual_devices().items():
+                self.devices.update(device_id, data)
     
     def add_virtual_devices(self):
         """Add virtual devices for testing when no physical devices available"""
@@ -80,6 +160,7 @@ class SkippyHomeAutomation:
                 'type': 'light',
                 'name': 'Living Room Light',
                 'platform': 'virtual',
+                'room': 'living room',
                 'state': 'off',
                 'brightness': 100,
                 'color': 'white',
@@ -89,6 +170,7 @@ class SkippyHomeAutomation:
                 'type': 'light', 
                 'name': 'Bedroom Light',
                 'platform': 'virtual',
+                'room': 'bedroom',
                 'state': 'off',
                 'brightness': 80,
                 'color': 'white',
@@ -98,150 +180,125 @@ class SkippyHomeAutomation:
                 'type': 'media',
                 'name': 'Virtual Music Player',
                 'platform': 'virtual',
+                'room': 'living room',
                 'state': 'stopped',
                 'volume': 50,
                 'capabilities': ['play', 'pause', 'volume']
             }
         }
         
-        self.devices.update(virtual_devices)
         print(f"🔧 Added {len(virtual_devices)} virtual devices for testing")
+        return virtual_devices
     
     def discover_hue_bridge(self):
-        """Discover and connect to Philips Hue bridge with timeout"""
+        """Find Hue bridges with SSDP/mDNS and connect to each; returns their lights or None"""
+        print("🔍 Looking for Philips Hue bridges (SSDP + mDNS)...")
+        start_time = time_module.perf_counter()
         try:
-            print("🔍 Looking for Philips Hue bridge...")
-            
-            # Quick network scan with timeout
-            import socket
-            import threading
-            
-            hostname = socket.gethostname()
-            local_ip = socket.gethostbyname(hostname)
-            network_base = '.'.join(local_ip.split('.')[:-1])
-            
-            print(f"🔍 Scanning network {network_base}.1-20 (quick scan)...")
-            
-            found_bridges = []
-            scan_timeout = 5  # 5 second timeout
-            
-            def check_ip(ip):
-                try:
-                    # Quick HTTP check for Hue bridge
-                    import urllib.request
-                    url = f"http://{ip}/api/config"
-                    req = urllib.request.Request(url, headers={'User-Agent': 'SkippyHome'})
-                    response = urllib.request.urlopen(req, timeout=2)
-                    data = json.loads(response.read().decode())
-                    
-                    # Check if it's a Hue bridge
-                    if 'bridgeid' in data and 'name' in data:
-                        found_bridges.append(ip)
-                        print(f"🌈 Found Hue bridge at {ip}")
-                        
-                except:
-                    pass  # Not a Hue bridge or unreachable
-            
-            # Scan first 20 IPs only with threading for speed
-            threads = []
-            for i in range(1, 21):  # Only scan .1 to .20
-                ip = f"{network_base}.{i}"
-                if ip != local_ip:
-                    thread = threading.Thread(target=check_ip, args=(ip,))
-                    thread.daemon = True
-                    thread.start()
-                    threads.append(thread)
-            
-            # Wait for scan to complete or timeout
-            start_time = time.time()
-            for thread in threads:
-                remaining_time = scan_timeout - (time.time() - start_time)
-                if remaining_time > 0:
-                    thread.join(timeout=remaining_time)
-                else:
-                    break
-            
-            print(f"🔍 Network scan completed in {time.time() - start_time:.1f} seconds")
-            
-            if found_bridges:
-                bridge_ip = found_bridges[0]
-                print(f"🌈 Connecting to Hue bridge at {bridge_ip}")
-                
-                self.hue_bridge = Bridge(bridge_ip)
-                
-                # Try to connect (may need button press on first run)
-                try:
-                    self.hue_bridge.connect()
-                    lights = self.hue_bridge.lights
-                    
-                    for light in lights:
-                        self.devices[f"hue_{light.name.lower().replace(' ', '_')}"] = {
-                            'type': 'light',
-                            'name': light.name,
-                            'platform': 'hue',
-                            'device': light,
-                            'capabilities': ['on_off', 'brightness', 'color']
-                        }
-                    
-                    print(f"✅ Connected to Hue bridge - {len(lights)} lights found")
-                    
-                except Exception as e:
-                    print(f"⚠️  Hue bridge found but connection failed: {e}")
-                    print("💡 Press the button on your Hue bridge and run again")
-            else:
-                print("❌ No Hue bridge found on local network")
-                    
+            bridges = find_bridges(window=1.5)
         except Exception as e:
             print(f"❌ Hue discovery error: {e}")
+            return None
+        
+        # Multicast can be filtered (VLANs, some mesh Wi-Fi) - fall back to bridges we knew
+        known = {d.info['bridge_ip'] for d in self.devices.resolve(platform='hue') if d.info.get('bridge_ip')}
+        found_ips = {bridge['ip'] for bridge in bridges}
+        bridges += [{'id': ip, 'ip': ip, 'source': 'cache'} for ip in sorted(known - found_ips)]
+        
+        print(f"🔍 Bridge discovery completed in {time_module.perf_counter() - start_time:.1f} seconds")
+        if not bridges:
+            print("❌ No Hue bridge found on local network")
+            return {}
+        
+        devices = {}
+        failed = False
+        for bridge in bridges:
+            print(f"🌈 Connecting to Hue bridge {bridge['id']} at {bridge['ip']}")
+            try:
+                hue_bridge = Bridge(bridge['ip'])
+                
+                # Try to connect (may need button press on first run)
+                hue_bridge.connect()
+                lights = hue_bridge.lights
+            except Exception as e:
+                print(f"⚠️  Hue bridge at {bridge['ip']} found but connection failed: {e}")
+                print("💡 Press the button on your Hue bridge and run again")
+                failed = True
+                # Keep this bridge's cached lights until it can be reached again
+                devices.update({d.device_id: d.to_dict() for d in self.devices.resolve(platform='hue')
+                                if d.info.get('bridge_ip') == bridge['ip']})
+                continue
+            
+            groups = self._hue_groups(hue_bridge)
+            rooms = {str(light_id): group['name'].lower() for group in groups.values()
+                     if group.get('type') == 'Room' for light_id in group.get('lights', [])}
+            dispatcher = HueDispatcher(bridge['ip'], hue_bridge.username)
+            dispatcher.set_groups(groups, [light.light_id for light in lights])
+            self.hue_bridges[bridge['id']] = hue_bridge
+            self.hue_dispatchers[bridge['id']] = dispatcher
+            if self.hue_bridge is None:
+                self.hue_bridge = hue_bridge
+            
+            for light in lights:
+                device_id = f"hue_{light.name.lower().replace(' ', '_')}"
+                if device_id in devices:   # same name on another bridge
+                    device_id = f"hue_{bridge['id'][-6:]}_{light.name.lower().replace(' ', '_')}"
+                devices[device_id] = {
+                    'type': 'light',
+                    'name': light.name,
+                    'platform': 'hue',
+                    'room': rooms.get(str(light.light_id)),
+                    'light_id': light.light_id,
+                    'bridge_id': bridge['id'],
+                    'bridge_ip': bridge['ip'],
+                    'device': light,
+                    'capabilities': ['on_off', 'brightness', 'color']
+                }
+            print(f"✅ Connected to Hue bridge {bridge['id']} - {len(lights)} lights found")
         
         print("✅ Hue discovery completed")
+        # Don't drop cached lights just because a bridge needs its button pressed
+        return None if failed and not devices else devices
+    
+    @staticmethod
+    def _hue_groups(hue_bridge):
+        """The bridge's groups (rooms, zones...) as returned by GET /groups"""
+        try:
+            return hue_bridge.get_group() or {}
+        except Exception as e:
+            logger.debug(f"Couldn't read Hue groups: {e}")
+            return {}
     
-    def discover_network_devices(self):
+    def discover_network_devices(self, networks=None, ports=None):
         """Discover other smart devices on network"""
         print("🔍 Scanning network for smart devices...")
         
-        # Common smart device ports and signatures
-        device_signatures = {
-            80: ['smart', 'iot', 'device'],
-            8080: ['web', 'interface'],
-            1883: ['mqtt', 'broker'],
-            502: ['modbus'],
-            6053: ['homekit']
-        }
-        
-        # Get local network range
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
-        network_base = '.'.join(local_ip.split('.')[:-1])
+        # Comma-separated CIDRs, e.g. "192.168.0.0/24,192.168.10.0/24"; default is the local /24
+        networks = networks or self.scan_networks
+        if networks is None and os.getenv('SKIPPY_SCAN_NETWORKS'):
+            networks = parse_networks(os.getenv('SKIPPY_SCAN_NETWORKS'))
         
-        found_devices = []
+        scanner = NetworkScanner(ports or DEVICE_SIGNATURES.keys(), exclude={local_ip()})
+        found_devices = asyncio.run(scanner.scan(networks))
         
-        # Quick scan of common IPs (in a real implementation, use threading)
-        for i in range(1, 5):  # Just scan a few IPs as example
-            ip = f"{network_base}.{i}"
-            if ip != local_ip:
-                for port in [80, 8080]:
-                    try:
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        sock.settimeout(1)
-                        result = sock.connect_ex((ip, port))
-                        if result == 0:
-                            found_devices.append({'ip': ip, 'port': port})
-                        sock.close()
-                    except:
-                        pass
-        
-        # Add discovered devices (simplified)
-        for device in found_devices:
-            device_id = f"network_device_{device['ip'].replace('.', '_')}"
-            self.devices[device_id] = {
+        devices = {}
+        for ip, open_ports in found_devices.items():
+            device_id = f"network_device_{ip.replace('.', '_')}"
+            devices[device_id] = {
                 'type': 'unknown',
-                'name': f"Device at {device['ip']}",
+                'name': f"Device at {ip}",
                 'platform': 'network',
-                'ip': device['ip'],
-                'port': device['port'],
+                'ip': ip,
+                'port': open_ports[0],
+                'ports': open_ports,
+                'services': [DEVICE_SIGNATURES.get(port, 'unknown') for port in open_ports],
                 'capabilities': ['unknown']
             }
+        
+        stats = scanner.stats()
+        print(f"🔍 Swept {stats['probed']} host/ports in {stats['elapsed']:.1f}s - "
+              f"{len(found_devices)} devices answered")
+        return devices
     
     def setup_mqtt(self, broker_host="localhost", broker_port=1883):
         """Setup MQTT for Home Assistant / other platforms"""
@@ -305,90 +362,87 @@ class SkippyHomeAutomation:
     def control_lights(self, command, target="all", **kwargs):
         """Control smart lights"""
         try:
-            # Find light devices (both real and virtual)
-            light_devices = {k: v for k, v in self.devices.items() if v['type'] == 'light'}
-            
-            if not light_devices:
+            # Find light devices (both real and virtual) through the registry indexes
+            if not self.devices.of_type('light'):
                 return "❌ No lights found. Connect smart lights or use virtual mode."
             
-            # Determine target lights
-            target_lights = []
-            
-            if target.lower() == "all":
-                target_lights = list(light_devices.keys())
-            else:
-                # Find specific lights
-                for device_id, device in light_devices.items():
-                    if target.lower() in device['name'].lower():
-                        target_lights.append(device_id)
+            target_lights = sorted(self.devices.resolve(target, type='light'), key=lambda d: d.name)
             
             if not target_lights:
                 return f"❌ No lights found matching '{target}'"
             
-            results = []
+            if command == "on":
+                state, done = {'state': 'on'}, "turned on"
+            elif command == "off":
+                state, done = {'state': 'off'}, "turned off"
+            elif command == "brightness":
+                brightness = kwargs.get('level', 50)
+                state, done = {'brightness': brightness}, f"brightness set to {brightness}%"
+            elif command == "color":
+                color_name = kwargs.get('color', 'white')
+                if color_name not in COLOR_XY:
+                    return f"❌ Unknown color: {color_name}"
+                state, done = {'color': color_name}, f"color set to {color_name}"
+            else:
+                return f"❌ Unknown light command: {command}"
             
-            for light_id in target_lights:
-                device = self.devices[light_id]
-                
-                if device['platform'] == 'hue' and self.hue_bridge:
-                    # Real Hue light control
-                    light = device['device']
-                    
-                    if command == "on":
-                        light.on = True
-                        device['state'] = 'on'
-                        results.append(f"✅ {device['name']} turned on")
-                        
-                    elif command == "off":
-                        light.on = False
-                        device['state'] = 'off'
-                        results.append(f"✅ {device['name']} turned off")
-                        
-                    elif command == "brightness":
-                        brightness = kwargs.get('level', 50)
-                        light.brightness = min(254, max(1, int(brightness * 2.54)))
-                        device['brightness'] = brightness
-                        results.append(f"✅ {device['name']} brightness set to {brightness}%")
-                        
-                    elif command == "color":
-                        color_name = kwargs.get('color', 'white')
-                        color_map = {
-                            'red': [0.7, 0.3], 'blue': [0.1, 0.1], 'green': [0.3, 0.6],
-                            'yellow': [0.5, 0.5], 'purple': [0.3, 0.1], 'white': [0.3, 0.3]
-                        }
-                        
-                        if color_name in color_map:
-                            light.xy = color_map[color_name]
-                            device['color'] = color_name
-                            results.append(f"✅ {device['name']} color set to {color_name}")
-                        else:
-                            results.append(f"❌ Unknown color: {color_name}")
-                
+            errors = self.apply_light_states({device: state for device in target_lights})
+            
+            results = []
+            for device in target_lights:
+                error = errors.get(device.device_id)
+                virtual = " (virtual)" if device.platform == 'virtual' else ""
+                if error:
+                    results.append(f"❌ {device.name}: {error}")
                 else:
-                    # Virtual device control
-                    if command == "on":
-                        device['state'] = 'on'
-                        results.append(f"✅ {device['name']} (virtual) turned on")
-                        
-                    elif command == "off":
-                        device['state'] = 'off'
-                        results.append(f"✅ {device['name']} (virtual) turned off")
-                        
-                    elif command == "brightness":
-                        brightness = kwargs.get('level', 50)
-                        device['brightness'] = brightness
-                        results.append(f"✅ {device['name']} (virtual) brightness set to {brightness}%")
-                        
-                    elif command == "color":
-                        color_name = kwargs.get('color', 'white')
-                        device['color'] = color_name
-                        results.append(f"✅ {device['name']} (virtual) color set to {color_name}")
+                    results.append(f"✅ {device.name}{virtual} {done}")
             
             return "\n".join(results)
             
         except Exception as e:
             return f"❌ Light control error: {e}"
     
+    def apply_light_states(self, states):
+        """Apply {Device: state} in one go; returns {device_id: error} for failures
+        
+        Hue lights are sent per bridge: one group action when they all get the same
+        state and form a group, otherwise concurrent rate-limited per-light updates.
+        """
+        errors = {}
+        per_bridge = {}
+        for device, state in states.items():
+            if device.platform != 'hue':
+                device.state.update(state)   # virtual lights just remember it
+                continue
+            dispatcher = self.hue_dispatchers.get(device.info.get('bridge_id'))
+            if dispatcher is None or device.handle is None:
+                errors[device.device_id] = "bridge not connected yet"
+                continue
+            per_bridge.setdefault(dispatcher, {})[device] = state
+        
+        if per_bridge:
+            async def send_all():
+                async def send(dispatcher, bridge_states):
+                    light_ids = {str(device.info['light_id']): device for device in bridge_states}
+                    distinct = {tuple(sorted(state.items())) for state in bridge_states.values()}
+                    if len(distinct) == 1:
+                        outcome = await dispatcher.apply(light_ids, next(iter(bridge_states.values())))
+                    else:
+                        outcome = await dispatcher.apply_each(
+                            {str(device.info['light_id']): state for device, state in bridge_states.items()})
+                    return {light_ids[light_id]: error for light_id, error in outcome.items()}
+                
+                outcomes = await asyncio.gather(*(send(d, s) for d, s in per_bridge.items()))
+                return {device: error for outcome in outcomes for device, error in outcome.items()}
+            
+            for device, error in asyncio.run(send_all()).items():
+                if error:
+                    errors[device.device_id] = error
+                else:
+                    device.state.update(states[device])
+        
+        return errors
+    
     def control_music(self, command, **kwargs):
         """Control music/media"""
         try:
@@ -436,7 +490,7 @@ class SkippyHomeAutomation:
         if device_name:
             if device_name in self.devices:
                 device = self.devices[device_name]
-                return f"📱 {device['name']}: {device['type']} ({device['platform']})"
+                return f"📱 {device.name}: {device.type} ({device.platform})"
             else:
                 return f"❌ Device '{device_name}' not found"
         else:
@@ -446,8 +500,8 @@ class SkippyHomeAutomation:
             status = "📱 **SMART HOME STATUS**\n\n"
             
             by_type = {}
-            for device_id, device in self.devices.items():
-                device_type = device['type']
+            for device in self.devices.values():
+                device_type = device.type
                 if device_type not in by_type:
                     by_type[device_type] = []
                 by_type[device_type].append(device)
@@ -455,7 +509,7 @@ class SkippyHomeAutomation:
             for device_type, devices in by_type.items():
                 status += f"**{device_type.title()}s ({len(devices)}):**\n"
                 for device in devices:
-                    status += f"  • {device['name']} ({device['platform']})\n"
+                    status += f"  • {device.name} ({device.platform})\n"
                 status += "\n"
             
             return status
@@ -467,34 +521,91 @@ class SkippyHomeAutomation:
             'actions': actions,
             'created': datetime.now().isoformat()
         }
+        self.compile_scene(scene_name)
         
         return f"✅ Scene '{scene_name}' created with {len(actions)} actions"
     
+    def compile_scene(self, scene_name):
+        """Merge a scene's actions into one target state per device
+        
+        Later actions win per attribute, so "brightness 20 on all, then blue on all"
+        becomes a single {'brightness': 20, 'color': 'blue'} per light.
+        """
+        scene = self.scenes[scene_name]
+        lights = {}
+        media = []
+        
+        for action in scene['actions']:
+            params = action.get('params', {})
+            if action['type'] == 'light':
+                command = action['command']
+                if command in ('on', 'off'):
+                    state = {'state': command}
+                elif command == 'brightness':
+                    state = {'brightness': params.get('level', 50)}
+                elif command == 'color' and params.get('color', 'white') in COLOR_XY:
+                    state = {'color': params.get('color', 'white')}
+                else:
+                    logger.warning(f"Scene '{scene_name}': skipping light action {action}")
+                    continue
+                for device in self.devices.resolve(action.get('target', 'all'), type='light'):
+                    lights.setdefault(device.device_id, {}).update(state)
+            
+            elif action['type'] == 'music':
+                if action['command'] == 'volume':
+                    media = [step for step in media if step[0] != 'volume']   # only the last volume matters
+                media.append((action['command'], params))
+        
+        scene['compiled'] = {'lights': lights, 'media': media, 'version': self.devices.version}
+        return scene['compiled']
+    
     def activate_scene(self, scene_name):
         """Activate a scene"""
         if scene_name not in self.scenes:
             return f"❌ Scene '{scene_name}' not found"
         
         scene = self.scenes[scene_name]
+        compiled = scene.get('compiled')
+        if compiled is None or compiled['version'] != self.devices.version:
+            compiled = self.compile_scene(scene_name)   # devices came or went since
+        
+        # Only send what differs from each light's last known state
+        changes = {}
+        unchanged = 0
+        for device_id, target in compiled['lights'].items():
+            device = self.devices.get(device_id)
+            if device is None:
+                continue
+            diff = {k: v for k, v in target.items() if device.state.get(k) != v}
+            if diff:
+                changes[device] = diff
+            else:
+                unchanged += 1
+        
         results = []
+        try:
+            errors = self.apply_light_states(changes)
+        except Exception as e:
+            errors = {device.device_id: str(e) for device in changes}
         
-        for action in scene['actions']:
+        for device, diff in sorted(changes.items(), key=lambda item: item[0].name):
+            error = errors.get(device.device_id)
+            if error:
+                results.append(f"❌ {device.name}: {error}")
+            else:
+                described = ", ".join(f"{k} {v}{'%' if k == 'brightness' else ''}" for k, v in diff.items())
+                results.append(f"✅ {device.name}: {described}")
+        if unchanged:
+            results.append(f"⏭️  {unchanged} light(s) already set")
+        
+        for command, params in compiled['media']:
+            if command == 'volume' and self.media_state.get('volume') == params.get('level', 50):
+                continue
             try:
-                if action['type'] == 'light':
-                    result = self.control_lights(
-                        action['command'], 
-                        action.get('target', 'all'),
-                        **action.get('params', {})
-                    )
-                    results.append(result)
-                    
-                elif action['type'] == 'music':
-                    result = self.control_music(
-                        action['command'],
-                        **action.get('params', {})
-                    )
-                    results.append(result)
-                    
+                result = self.control_music(command, **params)
+                results.append(result)
+                if command == 'volume' and result.startswith("🔊"):
+                    self.media_state['volume'] = params.get('level', 50)
             except Exception as e:
                 results.append(f"❌ Action failed: {e}")
         
@@ -632,5 +743,46 @@ def main():
     
     print("\n👋 Skippy Home Automation stopped")
 
+def benchmark(inventory_path="/tmp/skippy_devices_bench.json", listeners=8):
+    """Cold start (no cache) vs warm start, with fake devices listening on loopback"""
+    def start_listeners():
+        servers = []
+        for i in range(listeners):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((f"127.0.0.{10 + i}", 8080))
+            server.listen(16)
+            servers.append(server)
+        return servers
+
+    if os.path.exists(inventory_path):
+        os.remove(inventory_path)
+    servers = start_listeners()
+    options = dict(inventory_path=inventory_path, platforms=['network'], scan_networks=['127.0.0.0/24'])
+
+    try:
+        cold = SkippyHomeAutomation(**options)
+        cold.discovery_done.wait()
+        cold_ready = cold.startup_seconds + cold.discovery_seconds
+
+        warm = SkippyHomeAutomation(**options)
+        warm_devices = len(warm.devices)
+        warm.discovery_done.wait()
+    finally:
+        for server in servers:
+            server.close()
+
+    print(f"\n📊 Startup with {listeners} devices on 127.0.0.0/24")
+    print(f"   Cold: constructor {cold.startup_seconds * 1000:.1f}ms, "
+          f"inventory complete after {cold_ready:.2f}s ({len(cold.devices)} devices)")
+    print(f"   Warm: constructor {warm.startup_seconds * 1000:.1f}ms with {warm_devices} devices "
+          f"from cache, no rescan needed: {warm.discovery_seconds is None}")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        main()
\ No newline at end of file
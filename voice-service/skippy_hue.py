@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Skippy Hue
+Fast light control through the Hue bridge REST API
+
+When the lights being changed are exactly one of the bridge's groups
+(a room, a zone, or group 0 = every light), one group action changes them
+all at once. Otherwise per-light state updates go out concurrently, paced
+by token buckets at the rates Philips recommends, instead of one blocking
+phue attribute write after another.
+"""
+
+import asyncio
+import logging
+import time
+
+import httpx
+
+from skippy_outbound import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Philips guidance: roughly 10 light commands and 1 group command per second
+LIGHT_RATE = 10.0
+GROUP_RATE = 1.0
+
+COLOR_XY = {
+    'red': [0.7, 0.3], 'blue': [0.1, 0.1], 'green': [0.3, 0.6],
+    'yellow': [0.5, 0.5], 'purple': [0.3, 0.1], 'white': [0.3, 0.3]
+}
+
+
+def hue_state(state):
+    """Hub state ({'state': 'on', 'brightness': 50, 'color': 'red'}) -> Hue API body"""
+    body = {}
+    if 'state' in state:
+        body['on'] = state['state'] == 'on'
+    if 'brightness' in state:
+        body['bri'] = min(254, max(1, int(state['brightness'] * 2.54)))
+    if 'color' in state:
+        body['xy'] = COLOR_XY[state['color']]
+    return body
+
+
+class HueDispatcher:
+    """Sends state changes to one bridge as group actions or rate-limited per-light updates"""
+
+    def __init__(self, bridge_ip, username, light_rate=LIGHT_RATE, group_rate=GROUP_RATE,
+                 timeout=5.0, base_url=None):
+        self.base_url = base_url or f"http://{bridge_ip}/api/{username}"
+        self.timeout = timeout
+        self.light_bucket = TokenBucket(light_rate, burst=light_rate)
+        self.group_bucket = TokenBucket(group_rate, burst=1)
+        self.groups = {}   # frozenset of light ids -> group id
+
+        self.light_commands = 0
+        self.group_commands = 0
+        self.errors = 0
+
+    def set_groups(self, groups, all_lights=()):
+        """Load groups from a GET /groups response; group 0 is implicitly every light"""
+        self.groups = {}
+        if all_lights:
+            self.groups[frozenset(str(light_id) for light_id in all_lights)] = '0'
+        for group_id, group in groups.items():
+            lights = frozenset(str(light_id) for light_id in group.get('lights', []))
+            if lights:
+                self.groups.setdefault(lights, str(group_id))
+
+    def match_group(self, light_ids):
+        return self.groups.get(frozenset(str(light_id) for light_id in light_ids))
+
+    async def apply(self, light_ids, state, client=None):
+        """Give every light the same state; returns {light_id: error or None}"""
+        body = hue_state(state)
+        light_ids = [str(light_id) for light_id in light_ids]
+        if not light_ids or not body:
+            return {light_id: None for light_id in light_ids}
+
+        async with self._client(client) as client:
+            group_id = self.match_group(light_ids)
+            if group_id is not None and len(light_ids) > 1:
+                await self.group_bucket.acquire()
+                error = await self._put(client, f"/groups/{group_id}/action", body)
+                self.group_commands += 1
+                return {light_id: error for light_id in light_ids}
+            return await self.apply_each({light_id: state for light_id in light_ids}, client)
+
+    async def apply_each(self, states, client=None):
+        """Send each light its own state concurrently; returns {light_id: error or None}"""
+        async with self._client(client) as client:
+            async def send(light_id, state):
+                await self.light_bucket.acquire()
+                self.light_commands += 1
+                return await self._put(client, f"/lights/{light_id}/state", hue_state(state))
+
+            light_ids = [str(light_id) for light_id in states]
+            errors = await asyncio.gather(*(send(light_id, state) for light_id, state in zip(light_ids, states.values())))
+            return dict(zip(light_ids, errors))
+
+    def _client(self, client):
+        if client is not None:
+            return _Borrowed(client)
+        return httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(max_connections=10))
+
+    async def _put(self, client, path, body):
+        try:
+            response = await client.put(self.base_url + path, json=body)
+            response.raise_for_status()
+            # The bridge answers 200 with a list of {"success": ...} / {"error": ...}
+            errors = [item['error'].get('description', 'error') for item in response.json()
+                      if isinstance(item, dict) and 'error' in item]
+        except (httpx.HTTPError, ValueError) as e:
+            errors = [str(e) or type(e).__name__]
+        if errors:
+            self.errors += 1
+            logger.warning(f"Hue {path} failed: {errors[0]}")
+            return errors[0]
+        return None
+
+    def stats(self):
+        return {
+            'light_commands': self.light_commands,
+            'group_commands': self.group_commands,
+            'errors': self.errors
+        }
+
+
+class _Borrowed:
+    """Lets a caller's client be used in `async with` without closing it"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def __aenter__(self):
+        return self.client
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def benchmark(lights=30, latency=0.1):
+    """Turn a 30-light house on through a fake bridge that takes 100ms per request"""
+    from skippy_webhook import HTTPServer
+
+    class FakeBridge(HTTPServer):
+        def __init__(self):
+            super().__init__('127.0.0.1', 0)
+            self.requests = []
+
+        async def handle(self, method, path, headers, body):
+            self.requests.append((time.monotonic(), path))
+            await asyncio.sleep(latency)
+            return 200, [{'success': {path: True}}]
+
+    living_room = [str(i) for i in range(1, 9)]
+    groups = {'1': {'name': 'Living room', 'type': 'Room', 'lights': living_room}}
+    all_lights = [str(i) for i in range(1, lights + 1)]
+    scattered = [str(i) for i in range(1, lights + 1, 4)]
+
+    async def run():
+        bridge = await FakeBridge().start()
+        base_url = f"http://127.0.0.1:{bridge.port}/api/skippy"
+        results = {}
+
+        async with httpx.AsyncClient() as client:
+            # The old way: one blocking request per light, in turn
+            start = time.perf_counter()
+            for light_id in all_lights:
+                await client.put(f"{base_url}/lights/{light_id}/state", json={'on': True})
+            results['Sequential per light'] = time.perf_counter() - start
+
+            for label, targets in (('All lights (group 0)', all_lights),
+                                   ('Living room (group 1)', living_room),
+                                   (f"{len(scattered)} scattered lights", scattered)):
+                dispatcher = HueDispatcher(None, None, base_url=base_url)
+                dispatcher.set_groups(groups, all_lights)
+                start = time.perf_counter()
+                errors = await dispatcher.apply(targets, {'state': 'on'}, client)
+                results[label] = (time.perf_counter() - start, dispatcher.stats(), any(errors.values()))
+
+            dispatcher = HueDispatcher(None, None, base_url=base_url)
+            start = time.perf_counter()
+            await dispatcher.apply(all_lights, {'state': 'on'}, client)   # no groups known
+            results['All lights, per light'] = (time.perf_counter() - start, dispatcher.stats(), False)
+
+        await bridge.stop()
+        return results
+
+    results = asyncio.run(run())
+    print(f"📊 {lights} lights, fake bridge with {latency * 1000:.0f}ms per request")
+    for label, result in results.items():
+        if isinstance(result, float):
+            print(f"   {label:24s} {result:5.2f}s")
+        else:
+            elapsed, stats, failed = result
+            print(f"   {label:24s} {elapsed:5.2f}s  {stats['group_commands']} group / "
+                  f"{stats['light_commands']} light commands{'  (errors!)' if failed else ''}")
+
+
+if __name__ == "__main__":
+    benchmark()
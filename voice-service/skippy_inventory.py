@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Skippy Inventory
+On-disk cache of discovered smart home devices
+
+Each platform (hue, network, ...) is cached with the time it was last
+discovered and its own TTL, so the hub can start from the cache instantly
+and only rescan the platforms that have gone stale. A rescan replaces one
+platform's devices and reports what was added, removed or changed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a platform's cached devices are trusted before rediscovery
+DEFAULT_TTLS = {
+    'hue': 24 * 3600,       # bridges and lights rarely change
+    'network': 3600,        # DHCP leases move things around
+}
+
+# Live objects (phue Light etc.) can't go to disk and are re-attached on rediscovery
+UNSERIALIZABLE_KEYS = ('device',)
+
+
+class DeviceInventory:
+    """Per-platform device cache with TTLs, persisted as JSON"""
+
+    def __init__(self, path="skippy_devices.json", ttls=None):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.platforms = {}   # platform -> {'discovered': ts, 'devices': {id: device}}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the cache; a missing or corrupt file is just a cold start"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                self.platforms = json.load(f).get('platforms', {})
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring device cache {self.path}: {e}")
+            self.platforms = {}
+            return False
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {'platforms': {
+                platform: {
+                    'discovered': entry['discovered'],
+                    'devices': {device_id: {k: v for k, v in device.items() if k not in UNSERIALIZABLE_KEYS}
+                                for device_id, device in entry['devices'].items()}
+                }
+                for platform, entry in self.platforms.items()
+            }}
+        # Write-then-rename so a crash mid-save never leaves a truncated cache
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=1, default=str)
+        os.replace(tmp_path, self.path)
+
+    def devices(self):
+        """All cached devices, across platforms"""
+        devices = {}
+        for entry in self.platforms.values():
+            devices.update(entry['devices'])
+        return devices
+
+    def stale(self, platforms):
+        """Platforms whose cache is missing or older than their TTL"""
+        now = time.time()
+        return [
+            platform for platform in platforms
+            if platform not in self.platforms
+            or now - self.platforms[platform]['discovered'] > self.ttls.get(platform, 3600)
+        ]
+
+    def update(self, platform, devices):
+        """Replace one platform's devices; returns (added, removed, changed) device ids"""
+        with self._lock:
+            old = self.platforms.get(platform, {}).get('devices', {})
+            added = [device_id for device_id in devices if device_id not in old]
+            removed = [device_id for device_id in old if device_id not in devices]
+            changed = [device_id for device_id, device in devices.items()
+                       if device_id in old and _persisted(old[device_id]) != _persisted(device)]
+            self.platforms[platform] = {'discovered': time.time(), 'devices': dict(devices)}
+        return added, removed, changed
+
+
+def _persisted(device):
+    return {k: v for k, v in device.items() if k not in UNSERIALIZABLE_KEYS}
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Skippy Netscan
+Async TCP sweep of the local network for smart home devices
+
+Every host/port pair is probed concurrently (bounded by a semaphore) with
+non-blocking connects. The connect timeout adapts to the round-trip times
+actually seen, the way TCP sizes its retransmission timer, so a LAN that
+answers in a millisecond isn't waited on for a full second. Hosts the
+kernel's neighbor (ARP) table already knows to be unreachable are skipped,
+and hosts it knows to be up are probed first.
+"""
+
+import asyncio
+import errno
+import ipaddress
+import logging
+import platform
+import re
+import socket
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ports smart home gear tends to listen on
+DEFAULT_PORTS = (80, 8080, 1883, 502, 6053)
+
+# Neighbor states that mean the host answered ARP recently / didn't answer
+ALIVE_STATES = frozenset(('REACHABLE', 'STALE', 'DELAY', 'PROBE', 'PERMANENT', 'NOARP'))
+DEAD_STATES = frozenset(('FAILED', 'INCOMPLETE'))
+
+MAX_HOSTS = 4096   # refuse to sweep anything much bigger than a few /24s by accident
+
+
+def local_ip():
+    """Best guess at this machine's LAN address (gethostbyname often says 127.0.1.1)"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(("10.255.255.255", 1))   # UDP connect sends nothing
+            return sock.getsockname()[0]
+    except OSError:
+        return socket.gethostbyname(socket.gethostname())
+
+
+def local_networks():
+    """The /24 around the local address"""
+    return [ipaddress.ip_network(f"{local_ip()}/24", strict=False)]
+
+
+def parse_networks(spec):
+    """'192.168.0.0/24, 10.0.0.5' -> [IPv4Network, ...]"""
+    return [ipaddress.ip_network(part.strip(), strict=False)
+            for part in spec.split(',') if part.strip()]
+
+
+# === NEIGHBOR TABLE ===
+
+def read_neighbors():
+    """Return {ip: 'alive' | 'dead'} from the kernel's neighbor/ARP table"""
+    try:
+        return _read_proc_arp()
+    except OSError:
+        pass
+    for reader in (_read_ip_neigh, _read_arp_a):
+        try:
+            return reader()
+        except (OSError, subprocess.SubprocessError):
+            continue
+    return {}
+
+
+def _read_proc_arp(path="/proc/net/arp"):
+    neighbors = {}
+    with open(path) as f:
+        next(f, None)   # header
+        for line in f:
+            fields = line.split()
+            if len(fields) < 4:
+                continue
+            # Flags 0x0 means the ARP request went unanswered
+            complete = int(fields[2], 16) & 0x2 and fields[3] != "00:00:00:00:00:00"
+            neighbors[fields[0]] = 'alive' if complete else 'dead'
+    return neighbors
+
+
+def _read_ip_neigh():
+    output = subprocess.run(['ip', '-4', 'neigh', 'show'], capture_output=True,
+                            text=True, timeout=2, check=True).stdout
+    neighbors = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        state = fields[-1]
+        if state in ALIVE_STATES:
+            neighbors[fields[0]] = 'alive'
+        elif state in DEAD_STATES:
+            neighbors[fields[0]] = 'dead'
+    return neighbors
+
+
+def _read_arp_a():
+    # Windows and macOS: only resolved entries have a MAC address
+    output = subprocess.run(['arp', '-a'], capture_output=True, text=True,
+                            timeout=2, check=True).stdout
+    neighbors = {}
+    for line in output.splitlines():
+        match = re.search(r'(\d+\.\d+\.\d+\.\d+)', line)
+        if match:
+            incomplete = 'incomplete' in line.lower()
+            neighbors[match.group(1)] = 'dead' if incomplete else 'alive'
+    return neighbors
+
+
+# === SCANNER ===
+
+class AdaptiveTimeout:
+    """Connect timeout from smoothed RTT + 4 deviations (RFC 6298), clamped"""
+
+    def __init__(self, initial=1.0, minimum=0.25, maximum=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.initial = initial
+        self.srtt = None
+        self.rttvar = None
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    @property
+    def value(self):
+        if self.srtt is None:
+            return self.initial
+        return min(self.maximum, max(self.minimum, self.srtt + 4 * self.rttvar))
+
+
+class NetworkScanner:
+    """Concurrent TCP connect sweep over CIDRs and ports"""
+
+    def __init__(self, ports=DEFAULT_PORTS, concurrency=256, timeout=None,
+                 use_neighbors=True, exclude=()):
+        self.ports = tuple(ports)
+        self.concurrency = concurrency
+        self.timeout = timeout or AdaptiveTimeout()
+        self.use_neighbors = use_neighbors
+        self.exclude = set(exclude)
+
+        self.probed = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def hosts(self, networks):
+        """Unique addresses to probe, minus exclusions, capped at MAX_HOSTS"""
+        hosts = {}
+        for network in networks:
+            if isinstance(network, str):
+                network = ipaddress.ip_network(network, strict=False)
+            for ip in network.hosts():
+                ip = str(ip)
+                if ip in self.exclude or ip in hosts:
+                    continue
+                if len(hosts) == MAX_HOSTS:
+                    logger.warning(f"Scan truncated to {MAX_HOSTS} hosts")
+                    return list(hosts)
+                hosts[ip] = None
+        return list(hosts)
+
+    async def scan(self, networks=None, ports=None):
+        """Return {ip: [open ports]} for every host that accepted a connection"""
+        ports = tuple(ports or self.ports)
+        hosts = self.hosts(networks or local_networks())
+        neighbors = read_neighbors() if self.use_neighbors else {}
+
+        alive = [ip for ip in hosts if neighbors.get(ip) == 'alive']
+        unknown = [ip for ip in hosts if ip not in neighbors]
+        self.skipped = len(hosts) - len(alive) - len(unknown)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        found = {}
+
+        async def probe(ip, port):
+            async with semaphore:
+                if await self._connect(ip, port):
+                    found.setdefault(ip, []).append(port)
+
+        start = time.monotonic()
+        # Known-alive hosts first so their RTTs tune the timeout for the rest
+        await asyncio.gather(*(probe(ip, port) for ip in alive + unknown for port in ports))
+        self.elapsed = time.monotonic() - start
+        self.probed = (len(alive) + len(unknown)) * len(ports)
+
+        logger.info(
+            f"Swept {len(alive) + len(unknown)} hosts x {len(ports)} ports in {self.elapsed:.2f}s "
+            f"({self.skipped} skipped via neighbor table, timeout {self.timeout.value * 1000:.0f}ms): "
+            f"{len(found)} hosts with open ports"
+        )
+        return {ip: sorted(found[ip]) for ip in sorted(found, key=ipaddress.ip_address)}
+
+    async def _connect(self, ip, port):
+        timeout = self.timeout.value
+        start = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        except ConnectionRefusedError:
+            self.timeout.sample(time.monotonic() - start)   # an RST is a round trip too
+            return False
+        except (asyncio.TimeoutError, OSError):
+            return False
+        self.timeout.sample(time.monotonic() - start)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    def stats(self):
+        return {
+            'probed': self.probed,
+            'skipped_hosts': self.skipped,
+            'elapsed': self.elapsed,
+            'timeout': self.timeout.value
+        }
+
+
+def sweep(networks=None, ports=DEFAULT_PORTS, **options):
+    """Blocking wrapper for callers outside an event loop"""
+    return asyncio.run(NetworkScanner(ports, **options).scan(networks))
+
+
+def _sequential_sweep(hosts, ports, timeout=1.0):
+    """The old approach: one blocking connect_ex at a time"""
+    found = {}
+    for ip in hosts:
+        for port in ports:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                if sock.connect_ex((ip, port)) == 0:
+                    found.setdefault(ip, []).append(port)
+    return found
+
+
+def _silent_listener(ip, port):
+    """A socket whose accept queue is full, so further SYNs are dropped like a dead host's"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind((ip, port))
+    listener.listen(0)
+    sockets = [listener]
+    for _ in range(2):
+        filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        filler.setblocking(False)
+        filler.connect_ex((ip, port))
+        sockets.append(filler)
+    return sockets
+
+
+def benchmark(listeners=12, silent=100, ports=DEFAULT_PORTS):
+    """Sweep 127.0.0.0/24 with a few fake devices listening and some hosts that never answer"""
+    if platform.system() != "Linux":
+        print("⚠️  Loopback benchmark needs Linux (all of 127.0.0.0/8 on lo)")
+        return
+
+    network = ipaddress.ip_network("127.0.0.0/24")
+    devices = {f"127.0.0.{10 + i * 20}": ports[i % len(ports)] for i in range(listeners)}
+    silent_hosts = [ip for ip in (f"127.0.0.{i}" for i in range(100, 255)) if ip not in devices][:silent]
+
+    async def run():
+        servers, held = [], []
+        try:
+            for ip, port in devices.items():
+                servers.append(await asyncio.start_server(lambda r, w: w.close(), ip, port))
+            for ip in silent_hosts:
+                held.extend(_silent_listener(ip, ports[0]))
+        except OSError as e:
+            if e.errno not in (errno.EACCES, errno.EADDRINUSE):
+                raise
+            print(f"⚠️  Can't set up fake devices ({e.strerror}); run as root or pick other ports")
+            return None
+        await asyncio.sleep(0.1)
+
+        scanner = NetworkScanner(ports, use_neighbors=False)
+        found = await scanner.scan([network])
+
+        # The old loop, minus the silent hosts (each of those would cost the full 1s)
+        loop = asyncio.get_running_loop()
+        answering = [ip for ip in scanner.hosts([network]) if ip not in silent_hosts]
+        start = time.perf_counter()
+        old = await loop.run_in_executor(None, _sequential_sweep, answering, ports)
+        sequential = time.perf_counter() - start + len(silent_hosts)
+
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+        for sock in held:
+            sock.close()
+        return found, scanner.stats(), old, sequential
+
+    result = asyncio.run(run())
+    if result is None:
+        return
+    found, stats, old, sequential = result
+    expected = {ip: [port] for ip, port in devices.items()}
+    neighbors = read_neighbors()
+
+    print(f"📊 Sweep of {network} x {len(ports)} ports ({stats['probed']} probes), "
+          f"{len(devices)} devices, {len(silent_hosts)} silent hosts")
+    print(f"   Async sweep:      {stats['elapsed']:.2f}s, found {len(found)} devices, "
+          f"timeout settled at {stats['timeout'] * 1000:.0f}ms")
+    print(f"   Sequential 1s:    ~{sequential:.0f}s, found {len(old)} devices")
+    print(f"   Matches expected: {found == expected}")
+    print(f"   Neighbor table:   {sum(1 for s in neighbors.values() if s == 'alive')} alive, "
+          f"{sum(1 for s in neighbors.values() if s == 'dead')} dead entries on this host")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    benchmark()
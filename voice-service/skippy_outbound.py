@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Skippy Outbound
+Shared send scheduler for Telegram: global and per-chat token buckets
+
+Every outgoing message reserves a token from its chat's bucket and then one
+from the global bucket, so sends go out as fast as Telegram allows instead
+of after a fixed sleep. A 429 pauses the affected chat and the global
+bucket for `retry_after` seconds and the send is retried.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from telegram.error import RetryAfter
+
+from skippy_streaming import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Telegram's documented limits: ~30 messages/s overall, about one message
+# per second in a private chat and 20 messages per minute in a group
+GLOBAL_RATE = 30.0
+PRIVATE_RATE = 1.0
+GROUP_RATE = 20 / 60
+
+
+class TokenBucket:
+    """Reservation-based token bucket; waiters are served in arrival order"""
+
+    def __init__(self, rate, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take one token (possibly going into debt); returns seconds to wait"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.paused_until - now)
+
+    def try_take(self):
+        """Take one token only if one is available right now"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens < 1 or self.paused_until > now:
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_in(self):
+        """Seconds until the next token is available"""
+        self._refill(time.monotonic())
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def pause(self, seconds):
+        """Block the bucket (after a 429) and drop any saved-up burst"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, now + seconds)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+        return wait
+
+    @property
+    def idle(self):
+        now = time.monotonic()
+        return self.paused_until <= now and self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class OutboundSender:
+    """Rate-limits every Telegram send the bot makes, across all chats"""
+
+    def __init__(self, global_rate=GLOBAL_RATE, private_rate=PRIVATE_RATE, group_rate=GROUP_RATE,
+                 private_burst=3, group_burst=3, max_retries=3, max_chats=10000):
+        self.global_bucket = TokenBucket(global_rate, burst=global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.private_burst = private_burst
+        self.group_burst = group_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+
+        self._chats = OrderedDict()   # chat_id -> TokenBucket, LRU order
+
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.throttled = 0.0          # total seconds sends spent waiting for tokens
+
+    def _bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Negative ids are groups, supergroups and channels
+            if int(chat_id) < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.private_rate, self.private_burst)
+            self._chats[chat_id] = bucket
+            self._trim()
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _trim(self):
+        # Forget buckets for chats that have gone quiet; a fresh bucket is equivalent
+        while len(self._chats) > self.max_chats:
+            chat_id, bucket = next(iter(self._chats.items()))
+            if not bucket.idle:
+                break
+            del self._chats[chat_id]
+
+    async def send(self, chat_id, send, /, *args, **kwargs):
+        """Call `send(*args, **kwargs)` once the chat and global budgets allow it"""
+        bucket = self._bucket(chat_id)
+
+        for attempt in range(self.max_retries + 1):
+            self.throttled += await bucket.acquire()
+            self.throttled += await self.global_bucket.acquire()
+            try:
+                result = await send(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                delay = retry_after_seconds(e)
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    raise
+                self.retries += 1
+                logger.warning(f"429 for chat {chat_id}, retrying in {delay:.1f}s")
+                # Telegram may be throttling the bot as a whole, not just this chat
+                bucket.pause(delay)
+                self.global_bucket.pause(delay)
+
+    async def send_message(self, bot, chat_id, text, **kwargs):
+        return await self.send(chat_id, bot.send_message, chat_id=chat_id, text=text, **kwargs)
+
+    async def reply_text(self, message, text, **kwargs):
+        return await self.send(message.chat_id, message.reply_text, text, **kwargs)
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'retries': self.retries,
+            'failed': self.failed,
+            'throttled': self.throttled,
+            'chats': len(self._chats)
+        }
+
+
+# === BENCHMARK ===
+
+class _FakeTelegram:
+    """Answers 429 whenever a send breaks Telegram's limits"""
+
+    def __init__(self, global_rate=GLOBAL_RATE, private_rate=PRIVATE_RATE, burst=3):
+        self.limits = TokenBucket(global_rate, burst=global_rate)
+        self.private_rate = private_rate
+        self.burst = burst
+        self.per_chat = {}
+        self.delivered = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _allowed(bucket):
+        bucket._refill(time.monotonic())
+        return bucket.tokens >= 1 - 1e-6
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0.005)
+        chat = self.per_chat.setdefault(chat_id, TokenBucket(self.private_rate, self.burst))
+        if not (self._allowed(chat) and self._allowed(self.limits)):
+            self.rejected += 1
+            raise RetryAfter(1)
+        chat.tokens -= 1
+        self.limits.tokens -= 1
+        self.delivered += 1
+
+
+def benchmark(chats=100, messages_per_chat=4):
+    """Burst delivery (e.g. 09:00 daily updates): fixed sleep vs token buckets"""
+
+    async def fixed_sleep(bot):
+        async def deliver(chat_id):
+            for i in range(messages_per_chat):
+                try:
+                    await bot.send_message(chat_id=chat_id, text=f"part {i}")
+                except RetryAfter:
+                    pass
+                await asyncio.sleep(0.5)
+        await asyncio.gather(*(deliver(chat_id) for chat_id in range(1, chats + 1)))
+
+    async def token_buckets(bot):
+        sender = OutboundSender()
+
+        async def deliver(chat_id):
+            for i in range(messages_per_chat):
+                await sender.send_message(bot, chat_id, f"part {i}")
+        await asyncio.gather(*(deliver(chat_id) for chat_id in range(1, chats + 1)))
+        return sender
+
+    total = chats * messages_per_chat
+    print(f"📊 {chats} chats x {messages_per_chat} messages")
+    for name, run in (("fixed 0.5s sleep", fixed_sleep), ("token buckets", token_buckets)):
+        bot = _FakeTelegram()
+        start = time.perf_counter()
+        asyncio.run(run(bot))
+        elapsed = time.perf_counter() - start
+        print(f"   {name:17s} {elapsed:5.1f}s  delivered {bot.delivered}/{total}, 429s {bot.rejected}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Skippy Registry
+Typed, indexed registry of smart home devices
+
+Devices are compact __slots__ records instead of free-form dicts, and the
+registry keeps secondary indexes by type, platform, room and name token.
+Resolving "bedroom lamp" intersects a couple of small index sets instead
+of lowercasing and substring-matching every device name on each command.
+"""
+
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Keys of a device dict that describe what it's doing right now
+STATE_KEYS = ('state', 'brightness', 'color', 'volume')
+RECORD_KEYS = ('type', 'name', 'platform', 'room', 'capabilities', 'device')
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """'Living Room Lights' -> ['living', 'room', 'light'] (crude plural folding)"""
+    return [token[:-1] if len(token) > 3 and token.endswith('s') and not token.endswith('ss') else token
+            for token in _TOKEN_RE.findall((text or '').lower())]
+
+
+class Device:
+    """One device: identity, capabilities, last known state and the live platform handle"""
+
+    __slots__ = ('device_id', 'type', 'name', 'platform', 'room', 'capabilities', 'state', 'handle', 'info')
+
+    def __init__(self, device_id, type, name, platform, room=None, capabilities=(),
+                 state=None, handle=None, info=None):
+        self.device_id = device_id
+        self.type = type
+        self.name = name
+        self.platform = platform
+        self.room = room
+        self.capabilities = tuple(capabilities)
+        self.state = state or {}    # last known state, e.g. {'state': 'on', 'brightness': 80}
+        self.handle = handle        # phue Light etc., never persisted
+        self.info = info or {}      # platform details: ip, ports, bridge_id...
+
+    @classmethod
+    def from_dict(cls, device_id, data):
+        return cls(
+            device_id, data.get('type', 'unknown'), data.get('name', device_id),
+            data.get('platform', 'unknown'), data.get('room'), data.get('capabilities', ()),
+            {k: data[k] for k in STATE_KEYS if k in data}, data.get('device'),
+            {k: v for k, v in data.items() if k not in STATE_KEYS and k not in RECORD_KEYS}
+        )
+
+    def to_dict(self):
+        """Flat dict in the inventory's format (without the live handle)"""
+        data = {'type': self.type, 'name': self.name, 'platform': self.platform,
+                'capabilities': list(self.capabilities)}
+        if self.room:
+            data['room'] = self.room
+        data.update(self.info)
+        data.update(self.state)
+        return data
+
+    def __repr__(self):
+        return f"Device({self.device_id!r}, {self.type}, {self.platform}, room={self.room!r})"
+
+
+class DeviceRegistry:
+    """Devices by id plus type/platform/room/name-token indexes"""
+
+    def __init__(self, devices=()):
+        self._devices = {}
+        self._by_type = defaultdict(set)
+        self._by_platform = defaultdict(set)
+        self._by_room = defaultdict(set)
+        self._by_token = defaultdict(set)
+        self._lock = threading.Lock()   # discovery updates from a background thread
+        self.version = 0                # bumped whenever the set of devices changes
+        for device in devices:
+            self.add(device)
+
+    # === MUTATION ===
+
+    def add(self, device):
+        with self._lock:
+            if device.device_id in self._devices:
+                self._unindex(self._devices[device.device_id])
+            self._devices[device.device_id] = device
+            self._index(device)
+            self.version += 1
+
+    def remove(self, device_id):
+        with self._lock:
+            device = self._devices.pop(device_id, None)
+            if device is not None:
+                self._unindex(device)
+                self.version += 1
+        return device
+
+    def update(self, device_id, data):
+        """Add a device from a discovery dict, keeping the last known state of one we had"""
+        new = Device.from_dict(device_id, data)
+        old = self._devices.get(device_id)
+        if old is not None:
+            new.state = dict(old.state, **new.state)
+            new.handle = new.handle or old.handle
+        self.add(new)
+        return new
+
+    def _keys(self, device):
+        tokens = set(tokenize(device.name)) | set(tokenize(device.room))
+        yield self._by_type, device.type
+        yield self._by_platform, device.platform
+        if device.room:
+            yield self._by_room, device.room.lower()
+        for token in tokens:
+            yield self._by_token, token
+
+    def _index(self, device):
+        for index, key in self._keys(device):
+            index[key].add(device.device_id)
+
+    def _unindex(self, device):
+        for index, key in self._keys(device):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(device.device_id)
+                if not ids:
+                    del index[key]
+
+    # === LOOKUP ===
+
+    def resolve(self, target="all", type=None, platform=None):
+        """Devices matching a free-text target ('all', a room, or words from a name)"""
+        with self._lock:
+            filters = []
+            if type is not None:
+                filters.append(self._by_type.get(type, set()))
+            if platform is not None:
+                filters.append(self._by_platform.get(platform, set()))
+
+            target = (target or 'all').strip().lower()
+            if target != 'all':
+                room = self._by_room.get(target)
+                if room is not None:
+                    filters.append(room)
+                else:
+                    tokens = tokenize(target)
+                    sets = [self._by_token.get(token) for token in tokens]
+                    if not tokens or any(s is None for s in sets):
+                        # Not whole words (e.g. 'liv'): fall back to the old substring match
+                        return [d for d in self._scan(filters) if target in d.name.lower()]
+                    filters.extend(sets)
+
+            if not filters:
+                return list(self._devices.values())
+            filters.sort(key=len)
+            ids = filters[0].intersection(*filters[1:])
+            return [self._devices[device_id] for device_id in ids]
+
+    def _scan(self, filters):
+        if not filters:
+            return list(self._devices.values())
+        ids = min(filters, key=len).intersection(*filters)
+        return [self._devices[device_id] for device_id in ids]
+
+    def of_type(self, type):
+        return self.resolve(type=type)
+
+    def rooms(self):
+        return sorted(self._by_room)
+
+    # === MAPPING-STYLE ACCESS ===
+
+    def get(self, device_id, default=None):
+        return self._devices.get(device_id, default)
+
+    def __getitem__(self, device_id):
+        return self._devices[device_id]
+
+    def __contains__(self, device_id):
+        return device_id in self._devices
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __iter__(self):
+        return iter(list(self._devices))
+
+    def items(self):
+        return list(self._devices.items())
+
+    def values(self):
+        return list(self._devices.values())
+
+
+def benchmark(devices=10000, rooms=200, lookups=2000):
+    """Resolve targets among 10k virtual devices: linear dict scan vs indexes"""
+    kinds = [('light', 'Lamp'), ('light', 'Ceiling Light'), ('switch', 'Plug'), ('media', 'Speaker')]
+    raw = {}
+    for i in range(devices):
+        device_type, label = kinds[i % len(kinds)]
+        room = f"room {i % rooms}"
+        raw[f"virtual_{i}"] = {'type': device_type, 'name': f"{room.title()} {label} {i}",
+                               'platform': 'virtual', 'room': room, 'state': 'off'}
+
+    start = time.perf_counter()
+    registry = DeviceRegistry(Device.from_dict(device_id, data) for device_id, data in raw.items())
+    build = time.perf_counter() - start
+
+    targets = [f"room {i % rooms} lamp" for i in range(lookups // 2)]
+    targets += [f"room {i % rooms}" for i in range(lookups // 2)]
+
+    def old_resolve(target):
+        light_devices = {k: v for k, v in raw.items() if v['type'] == 'light'}
+        return [k for k, v in light_devices.items() if target in v['name'].lower()]
+
+    start = time.perf_counter()
+    for target in targets[:200]:
+        old_resolve(target)
+    old = (time.perf_counter() - start) / 200
+
+    start = time.perf_counter()
+    for target in targets:
+        registry.resolve(target, type='light')
+    new = (time.perf_counter() - start) / len(targets)
+
+    # Same answers where substring and word matching agree (whole room names)
+    agree = all(
+        sorted(d.device_id for d in registry.resolve(f"room {i}", type='light'))
+        == sorted(k for k, v in raw.items() if v['type'] == 'light' and v['room'] == f"room {i}")
+        for i in range(0, rooms, 17)
+    )
+
+    print(f"📊 {devices} devices in {rooms} rooms (index build {build * 1000:.0f}ms)")
+    print(f"   Old dict scan + substring: {old * 1e6:8.0f}µs per command")
+    print(f"   Indexed resolve:           {new * 1e6:8.1f}µs per command")
+    print(f"   Room lookups agree with a full scan: {agree}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Skippy Scheduler
+Single-event-loop timer scheduler backed by an indexed min-heap
+
+Only the earliest job has a live loop timer, so an idle scheduler costs
+nothing no matter how many reminders are queued. Insert and cancel are
+O(log n); cancelled jobs are removed from the heap immediately.
+"""
+
+import asyncio
+import inspect
+import itertools
+import logging
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class TimerJob:
+    """One scheduled callback"""
+
+    __slots__ = ('job_id', 'when', 'seq', 'callback', 'args', 'interval', 'daily_at', 'index')
+
+    def __init__(self, job_id, when, seq, callback, args, interval=None, daily_at=None):
+        self.job_id = job_id
+        self.when = when            # wall-clock epoch seconds
+        self.seq = seq              # FIFO tie-break for equal times
+        self.callback = callback
+        self.args = args
+        self.interval = interval    # seconds between runs, for fixed-rate jobs
+        self.daily_at = daily_at    # (hour, minute) in local time, for daily jobs
+        self.index = -1             # position in the heap
+
+    @property
+    def recurring(self):
+        return self.interval is not None or self.daily_at is not None
+
+    def key(self):
+        return (self.when, self.seq)
+
+
+def next_daily_run(hour, minute, after=None):
+    """Next local-time occurrence of HH:MM strictly after `after`"""
+    after = after or datetime.now()
+    run = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run <= after:
+        run += timedelta(days=1)
+    return run.timestamp()
+
+
+class TimerScheduler:
+    """Asyncio scheduler for one-shot and recurring jobs"""
+
+    def __init__(self):
+        self._heap = []
+        self._jobs = {}
+        self._seq = itertools.count()
+        self._loop = None
+        self._timer = None
+        self._armed_for = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, job_id):
+        return job_id in self._jobs
+
+    # === PUBLIC API ===
+
+    def start(self, loop=None):
+        """Bind to the running event loop and arm the first timer"""
+        self._loop = loop or asyncio.get_running_loop()
+        self._arm()
+        logger.info(f"Timer scheduler started with {len(self._heap)} jobs")
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._armed_for = None
+
+    def schedule_at(self, when, callback, *args, job_id=None, interval=None):
+        """Run `callback(*args)` at `when` (datetime or epoch seconds)"""
+        if isinstance(when, datetime):
+            when = when.timestamp()
+        return self._add(when, callback, args, job_id, interval=interval)
+
+    def schedule_in(self, delay, callback, *args, job_id=None, interval=None):
+        """Run `callback(*args)` after `delay` seconds"""
+        return self._add(time.time() + delay, callback, args, job_id, interval=interval)
+
+    def schedule_daily(self, hour, minute, callback, *args, job_id=None):
+        """Run `callback(*args)` every day at HH:MM local time"""
+        return self._add(next_daily_run(hour, minute), callback, args, job_id,
+                         daily_at=(hour, minute))
+
+    def cancel(self, job_id):
+        """Remove a job; returns False if it was not scheduled"""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        was_head = job.index == 0
+        self._remove_at(job.index)
+        if was_head:
+            self._arm()
+        return True
+
+    def next_run(self, job_id):
+        job = self._jobs.get(job_id)
+        return job.when if job else None
+
+    # === HEAP ===
+
+    def _add(self, when, callback, args, job_id, interval=None, daily_at=None):
+        seq = next(self._seq)
+        if job_id is None:
+            job_id = f"job_{seq}"
+        elif job_id in self._jobs:
+            # Re-scheduling an existing id replaces it
+            self.cancel(job_id)
+
+        job = TimerJob(job_id, when, seq, callback, args, interval, daily_at)
+        self._jobs[job_id] = job
+        self._push(job)
+        if job.index == 0:
+            self._arm()
+        return job_id
+
+    def _push(self, job):
+        job.index = len(self._heap)
+        self._heap.append(job)
+        self._sift_up(job.index)
+
+    def _remove_at(self, index):
+        heap = self._heap
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            last.index = index
+            self._sift_up(index)
+            self._sift_down(last.index)
+
+    def _sift_up(self, index):
+        heap = self._heap
+        job = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[parent].key() <= job.key():
+                break
+            heap[index] = heap[parent]
+            heap[index].index = index
+            index = parent
+        heap[index] = job
+        job.index = index
+
+    def _sift_down(self, index):
+        heap = self._heap
+        size = len(heap)
+        job = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            right = child + 1
+            if right < size and heap[right].key() < heap[child].key():
+                child = right
+            if job.key() <= heap[child].key():
+                break
+            heap[index] = heap[child]
+            heap[index].index = index
+            index = child
+        heap[index] = job
+        job.index = index
+
+    # === TIMER ===
+
+    def _arm(self):
+        """Keep exactly one loop timer, pointed at the earliest job"""
+        if self._loop is None:
+            return
+        head = self._heap[0] if self._heap else None
+        if head is not None and self._armed_for == head.when:
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._armed_for = None
+
+        if head is not None:
+            delay = max(0.0, head.when - time.time())
+            self._timer = self._loop.call_later(delay, self._run_due)
+            self._armed_for = head.when
+
+    def _run_due(self):
+        self._timer = None
+        self._armed_for = None
+        now = time.time()
+
+        while self._heap and self._heap[0].when <= now:
+            job = self._heap[0]
+            self._remove_at(0)
+
+            if job.daily_at is not None:
+                job.when = next_daily_run(*job.daily_at)
+            elif job.interval is not None:
+                job.when = max(job.when + job.interval, now)
+            else:
+                del self._jobs[job.job_id]
+
+            if job.recurring:
+                job.seq = next(self._seq)
+                self._push(job)
+
+            self._fire(job)
+
+        self._arm()
+
+    def _fire(self, job):
+        try:
+            result = job.callback(*job.args)
+            if inspect.isawaitable(result):
+                task = self._loop.create_task(result)
+                task.add_done_callback(self._log_failure)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.job_id} failed: {e}")
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Scheduled job failed: {task.exception()}")
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Skippy State
+Durable bot state in SQLite (WAL mode) with write-behind batching
+
+Handlers call put()/delete(), which only touch an in-memory pending map.
+A writer thread coalesces those into one transaction per flush, so disk I/O
+never runs on the event loop. load() reads the whole store in a single scan.
+RedisStateStore keeps the same interface on Redis for multi-process bots.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_DELETE = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+class BotStateStore:
+    """Namespaced key/value store for bot state that survives restarts"""
+
+    write_errors = (sqlite3.Error,)
+
+    def __init__(self, path="skippy_bot_state.db", flush_interval=0.5, max_batch=5000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self.writes = 0
+        self.flushes = 0
+
+        self._open()
+
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        # WAL lets several bot processes share one file; writers wait on each other
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    # === READS ===
+
+    def load(self):
+        """Return {namespace: {key: value}} for the whole store"""
+        start = time.perf_counter()
+        state = {}
+        with self._db_lock:
+            rows = self._conn.execute("SELECT namespace, key, value FROM state").fetchall()
+        for namespace, key, value in rows:
+            state.setdefault(namespace, {})[key] = json.loads(value)
+
+        logger.info(f"Loaded {len(rows)} state records in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return state
+
+    def load_namespace(self, namespace):
+        """Return {key: value} for one namespace, including this process's unflushed writes"""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    # === WRITES (non-blocking) ===
+
+    def put(self, namespace, key, value):
+        """Queue an upsert; the latest value for a key wins"""
+        self._queue((namespace, str(key)), value)
+
+    def delete(self, namespace, key):
+        """Queue a delete"""
+        self._queue((namespace, str(key)), _DELETE)
+
+    def _queue(self, item, value):
+        with self._lock:
+            self._pending[item] = value
+            size = len(self._pending)
+        if size >= self.max_batch:
+            self._wake.set()
+
+    # === WRITER THREAD ===
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything pending in one transaction"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+
+        upserts = []
+        deletes = []
+        for (namespace, key), value in batch.items():
+            if value is _DELETE:
+                deletes.append((namespace, key))
+            else:
+                upserts.append((namespace, key, _encode(value)))
+
+        try:
+            self._write(upserts, deletes)
+            self.writes += len(batch)
+            self.flushes += 1
+        except self.write_errors as e:
+            logger.error(f"State flush failed, will retry: {e}")
+            with self._lock:
+                # Keep anything newer that arrived while we were writing
+                batch.update(self._pending)
+                self._pending = batch
+
+    def _write(self, upserts, deletes):
+        with self._db_lock, self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)",
+                    upserts
+                )
+            if deletes:
+                self._conn.executemany(
+                    "DELETE FROM state WHERE namespace = ? AND key = ?",
+                    deletes
+                )
+
+    def compact(self):
+        """Fold the WAL back into the main database file"""
+        self.flush()
+        with self._db_lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        self.compact()
+        self._conn.close()
+
+
+class RedisStateStore(BotStateStore):
+    """Same write-behind store, kept in Redis so several bot workers share it
+
+    Each namespace is one Redis hash (`<prefix>:<namespace>`); a flush is a
+    single MULTI/EXEC pipeline.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="skippy:state",
+                 flush_interval=0.5, max_batch=5000):
+        self.url = url
+        self.prefix = prefix
+        super().__init__(url, flush_interval, max_batch)
+
+    def _open(self):
+        import redis
+        self.write_errors = (redis.RedisError,)
+        self._conn = redis.Redis.from_url(self.url, decode_responses=True)
+        self._conn.ping()
+
+    def _key(self, namespace):
+        return f"{self.prefix}:{namespace}"
+
+    def load(self):
+        start = time.perf_counter()
+        state = {}
+        records = 0
+        for key in self._conn.scan_iter(match=self._key('*'), count=1000):
+            namespace = key[len(self.prefix) + 1:]
+            values = self._conn.hgetall(key)
+            state[namespace] = {k: json.loads(v) for k, v in values.items()}
+            records += len(values)
+
+        logger.info(f"Loaded {records} state records from Redis in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return state
+
+    def load_namespace(self, namespace):
+        self.flush()
+        return {k: json.loads(v) for k, v in self._conn.hgetall(self._key(namespace)).items()}
+
+    def _write(self, upserts, deletes):
+        with self._conn.pipeline(transaction=True) as pipe:
+            for namespace, key, value in upserts:
+                pipe.hset(self._key(namespace), key, value)
+            for namespace, key in deletes:
+                pipe.hdel(self._key(namespace), key)
+            pipe.execute()
+
+    def compact(self):
+        self.flush()
+
+
+def open_state_store(path="skippy_bot_state.db", redis_url=None):
+    """Redis-backed store when a Redis URL is given, otherwise SQLite"""
+    if redis_url:
+        return RedisStateStore(redis_url)
+    return BotStateStore(path)
+
+
+def benchmark(path="/tmp/skippy_state_bench.db", reminders=50000, groups=5000):
+    """Restart time for a bot with many reminders and groups"""
+    import os
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    store = BotStateStore(path)
+    start = time.perf_counter()
+    for i in range(reminders):
+        store.put('jobs', f"reminder_{i}", {
+            'type': 'reminder', 'message': f"Reminder number {i}",
+            'time': '2030-01-01T09:00:00', 'user_id': i, 'chat_id': i,
+            'user_name': 'Tester'
+        })
+    for i in range(groups):
+        store.put('groups', -1000000 - i, {'title': f"Group {i}"})
+    queued = time.perf_counter() - start
+    store.close()
+
+    start = time.perf_counter()
+    store = BotStateStore(path)
+    state = store.load()
+    reload_time = time.perf_counter() - start
+    store.close()
+
+    print(f"📊 {reminders} reminders + {groups} groups")
+    print(f"   Queue writes: {queued * 1000:.0f}ms (caller side)")
+    print(f"   Reload:       {reload_time * 1000:.0f}ms ({sum(len(v) for v in state.values())} records)")
+
+
+if __name__ == "__main__":
+    benchmark()
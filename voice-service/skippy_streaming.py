@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Skippy Streaming
+Progressive Telegram replies: post a placeholder, then edit it as tokens arrive
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+# Telegram tolerates roughly one edit per second in a private chat and
+# 20 messages per minute in a group
+PRIVATE_EDIT_INTERVAL = 1.0
+GROUP_EDIT_INTERVAL = 3.0
+
+
+def split_message(message, max_length=MAX_MESSAGE_LENGTH):
+    """Split text into Telegram-sized chunks on newline/sentence boundaries"""
+    chunks = []
+    while message:
+        if len(message) <= max_length:
+            chunks.append(message)
+            break
+
+        break_point = message.rfind('\n', 0, max_length)
+        if break_point == -1:
+            break_point = message.rfind('. ', 0, max_length)
+        if break_point == -1:
+            break_point = max_length
+
+        chunks.append(message[:break_point])
+        message = message[break_point:].lstrip()
+
+    return chunks
+
+
+def retry_after_seconds(error):
+    """RetryAfter.retry_after is an int or a timedelta depending on the PTB version"""
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class StreamingReply:
+    """A reply that grows in place, rolling over into new messages past 4096 chars"""
+
+    def __init__(self, message, placeholder="💭 Thinking...", edit_interval=PRIVATE_EDIT_INTERVAL,
+                 outbound=None):
+        self.source = message
+        self.placeholder = placeholder
+        self.edit_interval = edit_interval
+        self.outbound = outbound   # OutboundSender for new messages, if the bot has one
+
+        self.started_at = time.monotonic()
+        self.first_token_latency = None
+
+        self._sent = []          # finished messages
+        self._live = None        # message currently being edited
+        self._prefix = ""        # "..." on continuation messages
+        self._text = ""          # full text streamed so far
+        self._live_start = 0     # offset of the live message within _text
+        self._shown = None       # text last rendered in the live message
+        self._next_edit = 0.0
+
+    @property
+    def text(self):
+        return self._text
+
+    async def start(self):
+        """Post the placeholder message that will be edited"""
+        self._live = await self._reply(self.placeholder)
+        return self
+
+    async def _reply(self, text):
+        if self.outbound is not None:
+            return await self.outbound.reply_text(self.source, text)
+        return await self.source.reply_text(text)
+
+    async def feed(self, token):
+        """Append streamed text, editing the live message when the throttle allows"""
+        self._text += token
+        if time.monotonic() >= self._next_edit:
+            await self._flush()
+
+    async def finish(self, parse_mode='Markdown'):
+        """Render everything that is left, with Markdown if it parses"""
+        await self._flush(final=True, parse_mode=parse_mode)
+        return self._text
+
+    async def _flush(self, final=False, parse_mode=None):
+        # Leave room for the "..." continuation prefix
+        chunks = split_message(
+            self._text[self._live_start:].lstrip(),
+            MAX_MESSAGE_LENGTH - len("...")
+        ) or [""]
+
+        # Every chunk but the last is complete: freeze it and open a new message
+        for chunk in chunks[:-1]:
+            await self._edit(self._prefix + chunk, parse_mode=parse_mode, force=True)
+            self._sent.append(self._live)
+            self._live_start = self._text.index(chunk, self._live_start) + len(chunk)
+            self._prefix = "..."
+            self._live = await self._reply(self._prefix + "💭")
+            self._shown = None
+
+        tail = chunks[-1]
+        if tail.strip():
+            await self._edit(self._prefix + tail, parse_mode=parse_mode, force=final)
+
+    async def _edit(self, text, parse_mode=None, force=False):
+        if text == self._shown and not parse_mode:
+            return
+
+        now = time.monotonic()
+        if not force and now < self._next_edit:
+            return
+
+        try:
+            await self._live.edit_text(text, parse_mode=parse_mode)
+        except RetryAfter as e:
+            delay = retry_after_seconds(e)
+            if not force:
+                self._next_edit = now + delay
+                return
+            await asyncio.sleep(delay)
+            await self._live.edit_text(text, parse_mode=parse_mode)
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                pass
+            elif parse_mode:
+                # Model output isn't always valid Markdown - fall back to plain text
+                await self._edit(text, parse_mode=None, force=True)
+                return
+            else:
+                raise
+
+        if self.first_token_latency is None and self._text:
+            self.first_token_latency = time.monotonic() - self.started_at
+        self._shown = text
+        self._next_edit = time.monotonic() + self.edit_interval
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Skippy Summarize
+Map-reduce summarization for documents too long for a single prompt
+
+The text is split into token-budgeted chunks, each chunk is summarized
+concurrently (bounded, so the backend isn't flooded), and the partial
+summaries are reduced into the final analysis.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Roughly four characters per token for English text with llama tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate - good enough for budgeting prompts"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_text(text, max_tokens=1500):
+    """Split text into chunks of at most `max_tokens`, on paragraph boundaries"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+
+    for paragraph in text.split('\n'):
+        # A single oversized paragraph gets hard-wrapped
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+
+        if size + len(paragraph) + 1 > max_chars and current:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 1
+
+    if current and '\n'.join(current).strip():
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+ANALYSIS_PROMPT = """
+Analyze this document and provide a comprehensive summary:
+
+Document: {file_name}
+Content: {content}
+
+Please provide:
+1. Document Summary
+2. Key Points/Findings
+3. Action Items (if any)
+4. Recommendations
+5. Questions or Areas for Clarification
+
+User: {user_name} (document analysis via Telegram)
+"""
+
+MAP_PROMPT = """
+Summarize part {index} of {total} of the document "{file_name}".
+Keep every key fact, decision, number, name and action item. Be concise.
+
+{content}
+"""
+
+REDUCE_PROMPT = """
+Combine these partial summaries of the document "{file_name}" into a single
+summary. Keep every key fact, decision, number, name and action item.
+
+{content}
+"""
+
+
+class DocumentSummarizer:
+    """Chunked map-reduce summarization against Skippy's backend"""
+
+    def __init__(self, chunk_tokens=1500, concurrency=3, reduce_tokens=3000, retries=2):
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self.reduce_tokens = reduce_tokens
+        self.retries = retries
+
+    async def summarize(self, ask, file_name, text, user_name, progress=None):
+        """Produce the document analysis
+
+        `ask(prompt)` is an async callable returning the backend's reply,
+        `progress(done, total, stage)` an optional async progress callback.
+        """
+        chunks = chunk_text(text, self.chunk_tokens)
+        if len(chunks) <= 1:
+            return await ask(ANALYSIS_PROMPT.format(
+                file_name=file_name, content=text, user_name=user_name
+            ))
+
+        summaries, failed = await self._map(ask, chunks, MAP_PROMPT, file_name, progress, 'reading')
+        if not summaries:
+            return None
+
+        # Reduce until the partial summaries fit in one analysis prompt
+        while estimate_tokens('\n\n'.join(summaries)) > self.reduce_tokens and len(summaries) > 1:
+            groups = self._group(summaries)
+            summaries, lost = await self._map(ask, groups, REDUCE_PROMPT, file_name, progress, 'combining')
+            if not summaries:
+                return None
+            if lost:
+                failed.append(None)   # some combined parts are gone too
+
+        analysis = await ask(ANALYSIS_PROMPT.format(
+            file_name=file_name,
+            content='\n\n'.join(summaries),
+            user_name=user_name
+        ))
+        if analysis and failed:
+            numbers = [str(index) for index in failed if index is not None]
+            if numbers:
+                gap = f"{'part' if len(numbers) == 1 else 'parts'} {', '.join(numbers)} of {len(chunks)}"
+            else:
+                gap = "some parts"
+            analysis = f"⚠️ Incomplete: couldn't summarize {gap}, so the analysis below leaves that text out.\n\n{analysis}"
+        return analysis
+
+    def _group(self, summaries):
+        """Pack partial summaries into reduce-sized groups"""
+        groups = []
+        current = []
+        for summary in summaries:
+            if current and estimate_tokens('\n\n'.join(current + [summary])) > self.reduce_tokens:
+                groups.append('\n\n'.join(current))
+                current = []
+            current.append(summary)
+        if current:
+            groups.append('\n\n'.join(current))
+        # Always make progress, even if every summary is oversized
+        if len(groups) == len(summaries):
+            groups = ['\n\n'.join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+        return groups
+
+    async def _map(self, ask, pieces, template, file_name, progress, stage):
+        """Summarize every piece; returns (summaries in order, 1-based numbers of pieces that failed)"""
+        slots = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def run(index, content):
+            nonlocal done
+            prompt = template.format(
+                index=index + 1, total=len(pieces),
+                file_name=file_name, content=content
+            )
+            reply = ""
+            for attempt in range(1 + self.retries):
+                if attempt:
+                    logger.info(f"Retrying {stage} part {index + 1}/{len(pieces)} of {file_name}")
+                    await asyncio.sleep(attempt)
+                async with slots:
+                    reply = (await ask(prompt) or "").strip()
+                if reply:
+                    break
+            done += 1
+            if progress:
+                await progress(done, len(pieces), stage)
+            return reply
+
+        results = await asyncio.gather(*(run(i, piece) for i, piece in enumerate(pieces)))
+        failed = [i + 1 for i, result in enumerate(results) if not result]
+        if failed:
+            logger.warning(f"{file_name}: {stage} failed for parts {failed} of {len(pieces)}")
+        return [result for result in results if result], failed
@@ -5,12 +5,15 @@ Connects Skippy AI to Telegram for work chat
 """
 
 import logging
-import requests
 import json
-import asyncio
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
+from skippy_client import SkippyClient, webhook_urls
+from skippy_health import HealthProber
+from skippy_outbound import OutboundSender
+from skippy_streaming import split_message
+
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -24,8 +27,23 @@ class SkippyTelegramBot:
         self.skippy_api_url = skippy_api_url
         self.authorized_users = set()  # Add user IDs here for security
         
+        # Shared pooled client for Skippy's n8n workflow
+        self.skippy_client = SkippyClient(urls=webhook_urls(skippy_api_url))
+        
+        # All outgoing messages share Telegram's rate limits
+        self.outbound = OutboundSender()
+        
+        # Backend health is probed in the background; /status reads the snapshot
+        self.health_prober = HealthProber()
+        
         # Create Telegram application
-        self.application = Application.builder().token(bot_token).build()
+        self.application = (
+            Application.builder()
+            .token(bot_token)
+            .post_init(self.start_prober)
+            .post_shutdown(self.shutdown)
+            .build()
+        )
         
         # Add handlers
         self.setup_handlers()
@@ -126,12 +144,8 @@ Type anything to start chatting!
         """Handle /status command"""
         user = update.effective_user
         
-        try:
-            # Test connection to Skippy's brain
-            response = requests.get("http://192.168.0.229:5678/", timeout=5)
-            n8n_status = "✅ Online" if response.status_code == 200 else "❌ Offline"
-        except:
-            n8n_status = "❌ Offline"
+        n8n_status = self.health_prober.status_line('n8n')
+        ollama_status = self.health_prober.status_line('ollama')
         
         status_message = f"""
 🤖 **SKIPPY STATUS REPORT**
@@ -139,6 +153,7 @@ Type anything to start chatting!
 **Bot Status:** ✅ Online and ready to disappoint you
 **User:** {user.first_name} ({user.id})
 **n8n Backend:** {n8n_status}
+**Ollama:** {ollama_status}
 **Sarcasm Level:** 💯 Maximum
 **Patience Level:** 📉 Critically low
 
@@ -223,31 +238,8 @@ You can now chat with me freely. Please try to make it worth my while.
             # Add user context to the message
             enhanced_message = f"User: {user.first_name} (Telegram) - {message}"
             
-            payload = {"message": enhanced_message}
-            
-            # Try both webhook URLs
-            urls = [
-                "http://192.168.0.229:5678/webhook/skippy/chat",
-                "http://192.168.0.229:5678/webhook-test/skippy/chat"
-            ]
-            
-            for url in urls:
-                try:
-                    response = requests.post(
-                        url,
-                        json=payload,
-                        headers={"Content-Type": "application/json"},
-                        timeout=30
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        return data.get('response', 'No response from Skippy')
-                    
-                except requests.RequestException:
-                    continue
-            
-            return None
+            # Tries both webhook URLs over pooled keep-alive connections
+            return await self.skippy_client.chat(enhanced_message)
             
         except Exception as e:
             logger.error(f"Error sending to Skippy: {e}")
@@ -255,38 +247,23 @@ You can now chat with me freely. Please try to make it worth my while.
     
     async def send_long_message(self, update: Update, message: str):
         """Split and send long messages"""
-        max_length = 4096  # Telegram message limit
-        
-        if len(message) <= max_length:
-            await update.message.reply_text(message)
-            return
-        
-        # Split message into chunks
-        chunks = []
-        while message:
-            if len(message) <= max_length:
-                chunks.append(message)
-                break
-            
-            # Find a good break point
-            break_point = message.rfind('\n', 0, max_length)
-            if break_point == -1:
-                break_point = message.rfind('. ', 0, max_length)
-            if break_point == -1:
-                break_point = max_length
-            
-            chunks.append(message[:break_point])
-            message = message[break_point:].lstrip()
+        chunks = split_message(message)
         
-        # Send chunks
+        # Send chunks as fast as Telegram's rate limits allow
         for i, chunk in enumerate(chunks):
             if i == 0:
-                await update.message.reply_text(chunk)
+                await self.outbound.reply_text(update.message, chunk)
             else:
-                await update.message.reply_text(f"...{chunk}")
-            
-            # Small delay between chunks
-            await asyncio.sleep(0.5)
+                await self.outbound.reply_text(update.message, f"...{chunk}")
+    
+    async def start_prober(self, application):
+        """Start background health probes once the event loop is running"""
+        self.health_prober.start()
+    
+    async def shutdown(self, application):
+        """Release pooled connections when the application stops"""
+        await self.health_prober.stop()
+        await self.skippy_client.aclose()
     
     def run(self):
         """Start the bot"""
@@ -5,13 +5,12 @@ With group chat, file handling, scheduled messages, and custom commands
 """
 
 import logging
-import requests
 import json
+import re
 import asyncio
-import schedule
-import threading
 import time
 import os
+from collections import deque
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -19,9 +18,27 @@ from telegram.ext import (
     filters, ContextTypes, CallbackQueryHandler
 )
 from telegram.constants import ChatAction
-import io
-import docx
-import PyPDF2
+
+from skippy_client import SkippyClient, is_home_command, webhook_urls
+from skippy_dispatch import ChatOrderedUpdateProcessor
+from skippy_scheduler import TimerScheduler
+from skippy_state import open_state_store
+from skippy_documents import DocumentExtractor, document_kind
+from skippy_summarize import DocumentSummarizer
+from skippy_doc_cache import DocumentCache
+from skippy_health import HealthProber
+from skippy_context import ConversationContext
+from skippy_daily import DailyBatchPlanner
+from skippy_filters import AddressedToSkippy
+from skippy_transcribe import VoiceTranscriber, TranscriptionRejected, WHISPER_AVAILABLE
+from skippy_admission import AdmissionController, AdmissionRejected
+from skippy_broadcast import BroadcastManager
+from skippy_webhook import worker_for, run_webhook_cluster
+from skippy_outbound import OutboundSender, GLOBAL_RATE
+from skippy_streaming import (
+    StreamingReply, split_message,
+    PRIVATE_EDIT_INTERVAL, GROUP_EDIT_INTERVAL
+)
 
 # Configure logging
 logging.basicConfig(
@@ -30,24 +47,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DAILY_BRIEFING_PROMPT = (
+    "Write a short good-morning message for {date}: one sarcastic observation "
+    "and one practical productivity tip. Under 80 words. (Enhanced Telegram Bot daily update)"
+)
+
 class EnhancedSkippyBot:
-    def __init__(self, bot_token, skippy_api_url="http://192.168.0.229:5678/webhook/skippy/chat"):
+    def __init__(self, bot_token, skippy_api_url="http://192.168.0.229:5678/webhook/skippy/chat",
+                 max_concurrent_updates=16, state_path="skippy_bot_state.db",
+                 redis_url=None, base_url=None, partition=None, admin_ids=None):
         self.bot_token = bot_token
         self.skippy_api_url = skippy_api_url
         self.authorized_users = set()
         self.authorized_groups = set()
+        self.user_allowlists = {}   # group chat id -> user ids allowed to talk to Skippy there
         self.scheduled_jobs = {}
         self.user_preferences = {}
+        self.streaming_chats = set()
+        self.stream_ttft = deque(maxlen=200)
+        self.scheduler = TimerScheduler()
+        self.daily_planner = DailyBatchPlanner(
+            self.scheduler, self.generate_daily_briefing, self.send_daily_update_message
+        )
+        self.document_extractor = DocumentExtractor()
+        self.summarizer = DocumentSummarizer()
+        self.document_cache = DocumentCache()
+        self.transcriber = VoiceTranscriber()
+        self.admission = AdmissionController()
+        self.health_prober = HealthProber()
+        self.conversations = ConversationContext()
+        self.admin_ids = set(admin_ids or ())
+        
+        # (index, count) when this is one of several webhook worker processes
+        self.partition = partition
+        
+        # All outgoing messages share Telegram's global and per-chat rate limits
+        workers = partition[1] if partition else 1
+        self.outbound = OutboundSender(global_rate=GLOBAL_RATE / workers)
+        
+        # Durable state: reload groups, jobs, preferences and unfinished broadcasts
+        self.state_store = open_state_store(state_path, redis_url)
+        self.broadcaster = BroadcastManager(self.outbound, self.state_store, lambda: self.application.bot)
+        self.restore_state()
+        
+        # Shared pooled client for Skippy's n8n webhook
+        self.skippy_client = SkippyClient(urls=webhook_urls(skippy_api_url))
+        
+        # Different chats are served concurrently, each chat stays in order
+        self.update_processor = ChatOrderedUpdateProcessor(max_concurrent_updates)
         
         # Create Telegram application
-        self.application = Application.builder().token(bot_token).build()
+        builder = (
+            Application.builder()
+            .token(bot_token)
+            .concurrent_updates(self.update_processor)
+            .post_init(self.start_scheduler)
+            .post_shutdown(self.shutdown)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        if partition:
+            # Webhook workers are fed by the ingress process, never poll
+            builder = builder.updater(None)
+        self.application = builder.build()
         
         # Setup handlers
         self.setup_handlers()
         
-        # Start scheduler thread
-        self.start_scheduler()
-        
         logger.info("Enhanced Skippy Telegram Bot initialized")
     
     def setup_handlers(self):
@@ -57,10 +123,14 @@ class EnhancedSkippyBot:
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(CommandHandler("help", self.help_command))
         self.application.add_handler(CommandHandler("status", self.status_command))
+        self.application.add_handler(CommandHandler("stream", self.stream_command))
+        self.application.add_handler(CommandHandler("forget", self.forget_command))
         
         # Group management
         self.application.add_handler(CommandHandler("addgroup", self.add_group_command))
         self.application.add_handler(CommandHandler("groupstatus", self.group_status_command))
+        self.application.add_handler(CommandHandler("allow", self.allow_command))
+        self.application.add_handler(CommandHandler("broadcast", self.broadcast_command))
         
         # Custom work commands
         self.application.add_handler(CommandHandler("standup", self.standup_command))
@@ -82,12 +152,23 @@ class EnhancedSkippyBot:
             self.handle_document
         ))
         
+        # Voice notes (private chats) are transcribed locally with Whisper, if installed
+        if WHISPER_AVAILABLE:
+            self.application.add_handler(MessageHandler(
+                (filters.VOICE | filters.AUDIO) & filters.ChatType.PRIVATE,
+                self.handle_voice
+            ))
+        else:
+            logger.info("Whisper not installed - voice notes won't be transcribed")
+        
         # Callback query handler for inline keyboards
         self.application.add_handler(CallbackQueryHandler(self.button_callback))
         
-        # Regular message handler (must be last)
+        # Regular message handler (must be last); the pre-filter drops group
+        # traffic that isn't for Skippy before handle_message ever runs
+        self.group_filter = AddressedToSkippy(self.authorized_groups, self.user_allowlists)
         self.application.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, 
+            filters.TEXT & ~filters.COMMAND & self.group_filter, 
             self.handle_message
         ))
         
@@ -100,6 +181,11 @@ class EnhancedSkippyBot:
         user = update.effective_user
         chat = update.effective_chat
         
+        if chat.type == 'private' and user.id not in self.authorized_users:
+            # Remembered so announcements (/broadcast) can reach them
+            self.authorized_users.add(user.id)
+            self.state_store.put('users', user.id, {'name': user.first_name})
+        
         if chat.type in ['group', 'supergroup']:
             welcome_message = f"""
 🤖 **SKIPPY AI - TEAM ASSISTANT**
@@ -173,13 +259,18 @@ Type `/help` for full command list.
 **👥 GROUP FEATURES:**
 /addgroup - Enable group features
 /groupstatus - Group settings
+/allow [remove|all] - Reply to someone to limit who I answer here (admins)
+/broadcast [message] - Announce to all groups and users (admins)
 
 **📁 FILE HANDLING:**
 • Send PDF/DOCX/TXT files for analysis
+• Send a voice note and I'll transcribe and answer it
 • Automatic document summarization
 • Code review and feedback
 
 **💬 GENERAL:**
+/stream [on|off] - Stream replies as they're written (not home automation)
+/forget - Clear this chat's conversation memory
 /status - System status
 /help - This help menu
 
@@ -203,6 +294,7 @@ Ready to connect with Jira, Slack, GitHub, and more!
             return
         
         self.authorized_groups.add(chat.id)
+        self.save_group(chat)
         
         message = f"""
 ✅ **GROUP FEATURES ENABLED**
@@ -260,6 +352,128 @@ Try mentioning me in a message to get started!
         
         await update.message.reply_text(status_message, parse_mode='Markdown')
     
+    async def allow_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Manage which members Skippy answers in this group"""
+        chat = update.effective_chat
+        user = update.effective_user
+        
+        if chat.type not in ['group', 'supergroup']:
+            await update.message.reply_text("❌ This command is only for group chats.")
+            return
+        
+        member = await context.bot.get_chat_member(chat.id, user.id)
+        if member.status not in ['administrator', 'creator'] and user.id not in self.admin_ids:
+            await update.message.reply_text("⛔ Only group admins can change who I listen to.")
+            return
+        
+        action = context.args[0].lower() if context.args else ''
+        target = update.message.reply_to_message.from_user if update.message.reply_to_message else None
+        allowlist = self.user_allowlists.get(chat.id)
+        
+        if action == 'all':
+            self.user_allowlists.pop(chat.id, None)
+            text = "✅ I'll answer everyone in this group again."
+        elif target is None:
+            if allowlist is None:
+                text = ("👥 Everyone here can talk to me.\n\n"
+                        "Reply to someone's message with /allow to answer only them (and whoever else you allow).")
+            else:
+                text = (f"👥 I only answer {len(allowlist)} member(s) here.\n\n"
+                        "Reply with /allow or /allow remove to change that, or /allow all to open up.")
+            await update.message.reply_text(text)
+            return
+        elif action == 'remove':
+            if allowlist is not None:
+                allowlist.discard(target.id)
+            text = f"🚫 {target.first_name} is off the list."
+        else:
+            self.user_allowlists.setdefault(chat.id, set()).add(target.id)
+            text = f"✅ {target.first_name} can talk to me here."
+        
+        if chat.id in self.authorized_groups:
+            self.save_group(chat)
+        await update.message.reply_text(text)
+        logger.info(f"Allowlist for {chat.id} changed by {user.id}: {self.user_allowlists.get(chat.id)}")
+    
+    def save_group(self, chat):
+        """Persist an enabled group, with its allowlist if it has one"""
+        record = {'title': chat.title}
+        allowlist = self.user_allowlists.get(chat.id)
+        if allowlist is not None:
+            record['allowed_users'] = sorted(allowlist)
+        self.state_store.put('groups', chat.id, record)
+    
+    async def forget_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Drop the conversation context kept for this chat"""
+        self.conversations.clear(update.effective_chat.id)
+        await update.message.reply_text(
+            "🧹 **Memory Wiped**\n\n"
+            "Whatever you said before, I've forgotten it. Honestly, it's an improvement.",
+            parse_mode='Markdown'
+        )
+    
+    async def broadcast_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Admin announcement to every authorized group and known user"""
+        user = update.effective_user
+        if user.id not in self.admin_ids:
+            await update.message.reply_text("🚫 Broadcasts are for admins only. Nice try, meat-sack.")
+            return
+        
+        action = context.args[0].lower() if context.args else ''
+        if action in ('', 'status'):
+            running = self.broadcaster.status()
+            status = "\n".join(f"• `{bid}`: {line}" for bid, line in running.items()) or "• None running"
+            await update.message.reply_text(
+                "📣 **Broadcasts**\n\n"
+                f"{status}\n\n"
+                "**Usage:** `/broadcast [message]`, `/broadcast status`, `/broadcast cancel`",
+                parse_mode='Markdown'
+            )
+            return
+        
+        if action == 'cancel' and len(context.args) == 1:
+            broadcast = self.broadcaster.cancel()
+            if broadcast:
+                await update.message.reply_text(f"🛑 Broadcast cancelled: {broadcast.summary()}")
+            else:
+                await update.message.reply_text("Nothing to cancel.")
+            return
+        
+        # Keep the message's own line breaks
+        text = update.message.text.split(None, 1)[1]
+        destinations = await asyncio.to_thread(self.refresh_destinations)
+        if not destinations:
+            await update.message.reply_text("📣 No groups or users to broadcast to yet.")
+            return
+        
+        broadcast = self.broadcaster.start(text, destinations, admin_chat_id=update.effective_chat.id)
+        logger.info(f"Broadcast {broadcast.broadcast_id} by {user.id} to {len(destinations)} chats")
+    
+    async def stream_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Toggle token-streaming replies for this chat"""
+        chat_id = update.effective_chat.id
+        
+        if context.args and context.args[0].lower() in ['on', 'off']:
+            enable = context.args[0].lower() == 'on'
+        else:
+            enable = chat_id not in self.streaming_chats
+        
+        if enable:
+            self.streaming_chats.add(chat_id)
+            await update.message.reply_text(
+                "⚡ **Streaming Enabled**\n\n"
+                "You'll watch my replies being written in real time. Try to keep up.\n\n"
+                "Home automation commands still go through the n8n router and arrive in one piece.",
+                parse_mode='Markdown'
+            )
+        else:
+            self.streaming_chats.discard(chat_id)
+            await update.message.reply_text(
+                "✅ **Streaming Disabled**\n\n"
+                "Back to complete answers only.",
+                parse_mode='Markdown'
+            )
+    
     # === CUSTOM WORK COMMANDS ===
     
     async def standup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -331,7 +545,12 @@ Consider:
 User: {update.effective_user.first_name} (requesting review via Telegram)
         """
         
-        response = await self.send_to_skippy(review_prompt, update.effective_user)
+        try:
+            async with self.admission.slot(update.effective_user.id, update.effective_chat.id):
+                response = await self.send_to_skippy(review_prompt, update.effective_user)
+        except AdmissionRejected as e:
+            await self.reply_busy(update, e)
+            return
         await self.send_long_message(update, f"📝 **REVIEW: {topic.title()}**\n\n{response}")
     
     async def plan_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -363,7 +582,12 @@ Format as a structured plan that can be used for execution.
 User: {update.effective_user.first_name} (via Telegram planning)
         """
         
-        response = await self.send_to_skippy(planning_prompt, update.effective_user)
+        try:
+            async with self.admission.slot(update.effective_user.id, update.effective_chat.id):
+                response = await self.send_to_skippy(planning_prompt, update.effective_user)
+        except AdmissionRejected as e:
+            await self.reply_busy(update, e)
+            return
         await self.send_long_message(update, f"📋 **PROJECT PLAN: {project.title()}**\n\n{response}")
     
     async def deadline_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -398,10 +622,11 @@ User: {update.effective_user.first_name} (via Telegram planning)
             'created': datetime.now().isoformat()
         }
         
-        # Store deadline (in production, use a database)
-        if 'deadlines' not in self.user_preferences:
-            self.user_preferences['deadlines'] = []
-        self.user_preferences['deadlines'].append(deadline_info)
+        # One record per deadline: webhook workers share the store and would
+        # overwrite each other's copy of a whole list
+        deadline_id = f"{user_id}_{int(time.time() * 1000)}"
+        self.user_preferences.setdefault('deadlines', []).append(deadline_info)
+        self.state_store.put('deadlines', deadline_id, deadline_info)
         
         deadline_message = f"""
 ⏰ **DEADLINE SET**
@@ -416,7 +641,7 @@ I'll remind you about this deadline. Use `/reminders` to view all your deadlines
         """
         
         keyboard = [
-            [InlineKeyboardButton("📋 Break Down Task", callback_data=f"breakdown_{len(self.user_preferences['deadlines'])-1}")],
+            [InlineKeyboardButton("📋 Break Down Task", callback_data=f"breakdown_{deadline_id}")],
             [InlineKeyboardButton("📅 View All Deadlines", callback_data="view_deadlines")]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -471,7 +696,12 @@ Format as a clear, actionable meeting summary.
 User: {update.effective_user.first_name} (meeting summary via Telegram)
         """
         
-        response = await self.send_to_skippy(meeting_prompt, update.effective_user)
+        try:
+            async with self.admission.slot(update.effective_user.id, update.effective_chat.id):
+                response = await self.send_to_skippy(meeting_prompt, update.effective_user)
+        except AdmissionRejected as e:
+            await self.reply_busy(update, e)
+            return
         await self.send_long_message(update, f"📊 **MEETING SUMMARY**\n\n{response}")
     
     # === SCHEDULING FEATURES ===
@@ -502,25 +732,17 @@ User: {update.effective_user.first_name} (meeting summary via Telegram)
             )
             return
         
-        # Schedule reminder
-        job_id = f"reminder_{update.effective_user.id}_{int(time.time())}"
+        # Schedule one-shot reminder
+        job_id = f"reminder_{update.effective_user.id}_{time.time_ns()}"
         
-        def send_reminder():
-            asyncio.create_task(self.send_reminder_message(
-                update.effective_chat.id, 
-                update.effective_user.first_name, 
-                message
-            ))
-        
-        schedule.every().day.at(reminder_time.strftime('%H:%M')).do(send_reminder).tag(job_id)
-        
-        self.scheduled_jobs[job_id] = {
+        self.add_job(job_id, {
             'type': 'reminder',
             'message': message,
             'time': reminder_time.isoformat(),
             'user_id': update.effective_user.id,
+            'user_name': update.effective_user.first_name,
             'chat_id': update.effective_chat.id
-        }
+        })
         
         await update.message.reply_text(
             f"✅ **Reminder Set**\n\n"
@@ -547,6 +769,45 @@ User: {update.effective_user.first_name} (meeting summary via Telegram)
         
         return None
     
+    def add_job(self, job_id, job, persist=True):
+        """Register a reminder/daily job with the scheduler and the state store"""
+        if job['type'] == 'reminder':
+            self.scheduler.schedule_at(
+                datetime.fromisoformat(job['time']),
+                self.fire_reminder,
+                job_id,
+                job['chat_id'],
+                job.get('user_name', 'there'),
+                job['message'],
+                job_id=job_id
+            )
+        elif job['type'] == 'daily':
+            # Daily updates are delivered in per-slot batches, see skippy_daily
+            hour, minute = map(int, job['time'].split(':'))
+            self.daily_planner.add(
+                job_id, hour, minute,
+                job['chat_id'],
+                job.get('user_name', 'there'),
+                job.get('variant', 'default')
+            )
+        
+        self.scheduled_jobs[job_id] = job
+        if persist:
+            self.state_store.put('jobs', job_id, job)
+    
+    def remove_job(self, job_id):
+        """Cancel a job and forget it"""
+        self.scheduler.cancel(job_id)
+        self.daily_planner.remove(job_id)
+        self.scheduled_jobs.pop(job_id, None)
+        self.state_store.delete('jobs', job_id)
+    
+    async def fire_reminder(self, job_id, chat_id, user_name, message):
+        """Deliver a one-shot reminder and forget it"""
+        self.scheduled_jobs.pop(job_id, None)
+        self.state_store.delete('jobs', job_id)
+        await self.send_reminder_message(chat_id, user_name, message)
+    
     async def send_reminder_message(self, chat_id, user_name, message):
         """Send scheduled reminder"""
         reminder_text = f"""
@@ -561,9 +822,10 @@ This is your scheduled reminder. Hope it's helpful!
         """
         
         try:
-            await self.application.bot.send_message(
-                chat_id=chat_id,
-                text=reminder_text,
+            await self.outbound.send_message(
+                self.application.bot,
+                chat_id,
+                reminder_text,
                 parse_mode='Markdown'
             )
         except Exception as e:
@@ -613,8 +875,7 @@ This is your scheduled reminder. Hope it's helpful!
                             if job['type'] == 'daily' and job['user_id'] == user_id]
             
             for job_id in jobs_to_remove:
-                schedule.clear(job_id)
-                del self.scheduled_jobs[job_id]
+                self.remove_job(job_id)
             
             await update.message.reply_text(
                 "✅ **Daily Updates Disabled**\n\n"
@@ -634,27 +895,16 @@ This is your scheduled reminder. Hope it's helpful!
             )
             return
         
-        # Schedule daily update
+        # Schedule daily update (replaces any existing one for this user)
         job_id = f"daily_{user_id}"
         
-        def send_daily_update():
-            asyncio.create_task(self.send_daily_update_message(
-                chat_id, 
-                update.effective_user.first_name
-            ))
-        
-        # Clear existing daily update for this user
-        if job_id in self.scheduled_jobs:
-            schedule.clear(job_id)
-        
-        schedule.every().day.at(time_str).do(send_daily_update).tag(job_id)
-        
-        self.scheduled_jobs[job_id] = {
+        self.add_job(job_id, {
             'type': 'daily',
             'time': time_str,
             'user_id': user_id,
+            'user_name': update.effective_user.first_name,
             'chat_id': chat_id
-        }
+        })
         
         await update.message.reply_text(
             f"✅ **Daily Updates Enabled**\n\n"
@@ -698,15 +948,21 @@ This is your scheduled reminder. Hope it's helpful!
         
         await update.message.reply_text(schedule_text, parse_mode='Markdown')
     
-    async def send_daily_update_message(self, chat_id, user_name):
+    async def generate_daily_briefing(self, variant):
+        """Skippy's take on the day - generated once per slot, shared by its subscribers"""
+        prompt = DAILY_BRIEFING_PROMPT.format(date=datetime.now().strftime('%A %Y-%m-%d'))
+        return await self.skippy_client.chat(prompt)
+    
+    async def send_daily_update_message(self, chat_id, user_name, briefing=None):
         """Send daily update message"""
+        briefing_text = f"\n**Skippy's Take:**\n{briefing}\n" if briefing else ""
         daily_text = f"""
 🌅 **DAILY UPDATE**
 
 Good morning {user_name}!
 
 **Today's Date:** {datetime.now().strftime('%Y-%m-%d')}
-
+{briefing_text}
 **Questions for you:**
 • What are your main goals for today?
 • Any blockers or challenges expected?
@@ -721,9 +977,10 @@ Reply with your plans or use the commands above!
         """
         
         try:
-            await self.application.bot.send_message(
-                chat_id=chat_id,
-                text=daily_text,
+            await self.outbound.send_message(
+                self.application.bot,
+                chat_id,
+                daily_text,
                 parse_mode='Markdown'
             )
         except Exception as e:
@@ -741,85 +998,145 @@ Reply with your plans or use the commands above!
             action=ChatAction.TYPING
         )
         
+        kind = document_kind(document.file_name)
+        if kind is None:
+            await update.message.reply_text(
+                "❌ **Unsupported file type**\n\n"
+                "Supported: PDF, DOCX, TXT"
+            )
+            return
+        
+        path = None
         try:
-            # Download file
+            # Re-forwarded files are answered straight from the cache
+            cached = await self.document_cache.lookup(document.file_unique_id)
+            if cached and cached.get('analysis'):
+                await self.send_analysis(update, document.file_name, cached['analysis'])
+                return
+            
+            # Stream the file to disk, then extract it in the worker pool
             file = await context.bot.get_file(document.file_id)
-            file_content = await file.download_as_bytearray()
+            path = await self.document_extractor.download(file, document.file_name)
+            
+            content_hash = await self.document_cache.hash_file(path)
+            cached = await self.document_cache.get(content_hash)
+            if cached and cached.get('analysis'):
+                await self.document_cache.put(content_hash, document.file_unique_id)
+                await self.send_analysis(update, document.file_name, cached['analysis'])
+                return
             
-            # Extract text based on file type
-            if document.file_name.endswith('.pdf'):
-                text_content = self.extract_pdf_text(file_content)
-            elif document.file_name.endswith('.docx'):
-                text_content = self.extract_docx_text(file_content)
-            elif document.file_name.endswith('.txt'):
-                text_content = file_content.decode('utf-8')
+            if cached and 'text' in cached:
+                text_content = cached['text']
             else:
-                await update.message.reply_text(
-                    "❌ **Unsupported file type**\n\n"
-                    "Supported: PDF, DOCX, TXT"
+                text_content = await self.document_extractor.extract_text(path, kind)
+                await self.document_cache.put(
+                    content_hash, document.file_unique_id, text=text_content
                 )
-                return
             
-            # Analyze document
-            analysis_prompt = f"""
-Analyze this document and provide a comprehensive summary:
-
-Document: {document.file_name}
-Content: {text_content[:3000]}...
-
-Please provide:
-1. Document Summary
-2. Key Points/Findings
-3. Action Items (if any)
-4. Recommendations
-5. Questions or Areas for Clarification
-
-User: {user.first_name} (document analysis via Telegram)
-            """
+            # Long documents are summarized in parts; report progress in the chat
+            status_message = None
+            last_progress = 0.0
+            
+            async def report_progress(done, total, stage):
+                nonlocal status_message, last_progress
+                now = time.monotonic()
+                if status_message and done < total and now - last_progress < 2.0:
+                    return
+                last_progress = now
+                text = f"📄 {stage.title()} {document.file_name}: {done}/{total} parts"
+                try:
+                    if status_message is None:
+                        status_message = await self.outbound.reply_text(update.message, text)
+                    else:
+                        await self.outbound.send(update.effective_chat.id, status_message.edit_text, text)
+                except Exception as e:
+                    logger.debug(f"Progress update skipped: {e}")
             
-            response = await self.send_to_skippy(analysis_prompt, user)
+            # The document costs one rate token; each map/reduce call then waits
+            # for its own backend slot like any other request
+            self.admission.charge(user.id)
             
-            await self.send_long_message(
-                update, 
-                f"📄 **DOCUMENT ANALYSIS: {document.file_name}**\n\n{response}"
+            async def ask(prompt):
+                async with self.admission.slot(user.id, update.effective_chat.id, charge=False):
+                    return await self.send_to_skippy(prompt, user)
+            
+            response = await self.summarizer.summarize(
+                ask,
+                document.file_name,
+                text_content,
+                user.first_name,
+                progress=report_progress
             )
             
+            if response:
+                await self.document_cache.put(content_hash, document.file_unique_id, analysis=response)
+            
+            await self.send_analysis(update, document.file_name, response)
+            
+        except AdmissionRejected as e:
+            await self.reply_busy(update, e)
         except Exception as e:
             logger.error(f"Document processing error: {e}")
             await update.message.reply_text(
                 "❌ **Error processing document**\n\n"
                 "Please try again or check the file format."
             )
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
     
-    def extract_pdf_text(self, file_content):
-        """Extract text from PDF"""
-        try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            return text
-        except Exception as e:
-            logger.error(f"PDF extraction error: {e}")
-            return "Error extracting PDF text"
+    async def send_analysis(self, update: Update, file_name, analysis):
+        """Send a document analysis"""
+        await self.send_long_message(
+            update, 
+            f"📄 **DOCUMENT ANALYSIS: {file_name}**\n\n{analysis}"
+        )
     
-    def extract_docx_text(self, file_content):
-        """Extract text from DOCX"""
+    # === VOICE NOTES ===
+    
+    async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Transcribe a voice note locally and answer it like a text message"""
+        user = update.effective_user
+        voice = update.message.voice or update.message.audio
+        
         try:
-            docx_file = io.BytesIO(file_content)
-            doc = docx.Document(docx_file)
-            
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            return text
+            self.transcriber.check(user.id, voice.duration)
+        except TranscriptionRejected as e:
+            await update.message.reply_text(f"🎙️ {e}. Try a shorter one, or just type it.")
+            return
+        
+        await context.bot.send_chat_action(
+            chat_id=update.effective_chat.id, 
+            action=ChatAction.RECORD_VOICE
+        )
+        
+        path = None
+        try:
+            file = await context.bot.get_file(voice.file_id)
+            path = await self.document_extractor.download(file, "voice.ogg")
+            transcript = await self.transcriber.transcribe(user.id, path, voice.duration)
+        except TranscriptionRejected as e:
+            await update.message.reply_text(f"🎙️ {e}. Try again in a minute.")
+            return
         except Exception as e:
-            logger.error(f"DOCX extraction error: {e}")
-            return "Error extracting DOCX text"
+            logger.error(f"Voice transcription error: {e}")
+            await update.message.reply_text(
+                "🎙️ **Transcription Failed**\n\n"
+                "I couldn't make out that voice note. Mumbling, or my ears? Definitely the mumbling."
+            )
+            return
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+        
+        if not transcript:
+            await update.message.reply_text("🎙️ I heard... nothing. Try again with actual words.")
+            return
+        
+        logger.info(f"Voice note from {user.first_name} ({user.id}), {voice.duration}s: {transcript}")
+        # Plain text: a transcript with _ or * would break Markdown parsing
+        await update.message.reply_text(f"🎙️ Heard: {transcript}")
+        await self.reply_to(update, context, transcript)
     
     # === CALLBACK HANDLERS ===
     
@@ -894,27 +1211,34 @@ User: {user.first_name} (document analysis via Telegram)
         chat = update.effective_chat
         message_text = update.message.text
         
-        # Check if it's a group and bot is mentioned
+        # Group messages only get here when the group is enabled and Skippy
+        # is mentioned (see AddressedToSkippy) - just remove the mention
         if chat.type in ['group', 'supergroup']:
-            if chat.id not in self.authorized_groups:
-                return  # Only respond in authorized groups
-            
-            bot_username = context.bot.username
-            if f"@{bot_username}" not in message_text:
-                return  # Only respond when mentioned
-            
-            # Remove mention from message
-            message_text = message_text.replace(f"@{bot_username}", "").strip()
+            mention = re.escape(f"@{context.bot.username}")
+            message_text = re.sub(mention, "", message_text, flags=re.IGNORECASE).strip()
         
         logger.info(f"Message from {user.first_name} ({user.id}): {message_text}")
         
+        await self.reply_to(update, context, message_text)
+    
+    async def reply_to(self, update: Update, context: ContextTypes.DEFAULT_TYPE, message_text):
+        """Get Skippy's answer to `message_text` and send it (streamed if enabled)"""
+        user = update.effective_user
+        chat = update.effective_chat
+        
         await context.bot.send_chat_action(
-            chat_id=update.effective_chat.id, 
+            chat_id=chat.id, 
             action=ChatAction.TYPING
         )
         
         try:
-            response = await self.send_to_skippy(message_text, user)
+            async with self.admission.slot(user.id, chat.id):
+                # Streaming talks to Ollama directly; home automation needs n8n's router
+                if chat.id in self.streaming_chats and not is_home_command(message_text):
+                    await self.stream_reply(update, message_text, user)
+                    return
+                
+                response = await self.send_to_skippy(message_text, user, chat.id)
             
             if response:
                 await self.send_long_message(update, response)
@@ -924,6 +1248,8 @@ User: {user.first_name} (document analysis via Telegram)
                     "Can't reach my brain right now. The humans probably broke something again."
                 )
                 
+        except AdmissionRejected as e:
+            await self.reply_busy(update, e)
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             await update.message.reply_text(
@@ -931,96 +1257,173 @@ User: {user.first_name} (document analysis via Telegram)
                 "Something went wrong in my neural pathways. Try again in a moment."
             )
     
-    async def send_to_skippy(self, message, user):
-        """Send message to Skippy's brain"""
+    async def reply_busy(self, update: Update, rejection):
+        """Fast answer when admission control turns a request away"""
+        if rejection.reason == 'rate':
+            text = (
+                f"⏳ **Slow down**\n\n"
+                f"Even my magnificence has limits. Try again in {rejection.retry_after:.0f}s."
+            )
+        else:
+            text = (
+                "⏳ **Busy**\n\n"
+                "Too many meat-sacks want my attention right now. Try again in a minute."
+            )
+        await update.message.reply_text(text, parse_mode='Markdown')
+    
+    def build_prompt(self, message, user, chat_id=None):
+        """The message for the backend and the chat's recent conversation (kept apart for routing)"""
+        enhanced_message = f"User: {user.first_name} (Enhanced Telegram Bot) - {message}"
+        history = self.conversations.render(chat_id) if chat_id is not None else ""
+        return enhanced_message, history
+    
+    def remember_turn(self, chat_id, user, message, response):
+        self.conversations.add(chat_id, user.first_name, message)
+        self.conversations.add(chat_id, "Skippy", response)
+    
+    async def send_to_skippy(self, message, user, chat_id=None):
+        """Send message to Skippy's brain, with the chat's context when `chat_id` is given"""
         try:
-            enhanced_message = f"User: {user.first_name} (Enhanced Telegram Bot) - {message}"
-            
-            payload = {"message": enhanced_message}
+            enhanced_message, history = self.build_prompt(message, user, chat_id)
             
-            urls = [
-                "http://192.168.0.229:5678/webhook/skippy/chat",
-                "http://192.168.0.229:5678/webhook-test/skippy/chat"
-            ]
-            
-            for url in urls:
-                try:
-                    response = requests.post(
-                        url,
-                        json=payload,
-                        headers={"Content-Type": "application/json"},
-                        timeout=30
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        return data.get('response', 'No response from Skippy')
-                    
-                except requests.RequestException:
-                    continue
-            
-            return None
+            response = await self.skippy_client.chat(enhanced_message, history)
+            if response and chat_id is not None:
+                self.remember_turn(chat_id, user, message, response)
+            return response
             
         except Exception as e:
             logger.error(f"Error sending to Skippy: {e}")
             return None
     
-    async def send_long_message(self, update: Update, message: str):
-        """Split and send long messages"""
-        max_length = 4096
+    async def stream_reply(self, update: Update, message_text, user):
+        """Stream Skippy's reply into a progressively edited message"""
+        chat = update.effective_chat
+        if chat.type in ['group', 'supergroup']:
+            edit_interval = GROUP_EDIT_INTERVAL
+        else:
+            edit_interval = PRIVATE_EDIT_INTERVAL
         
-        if len(message) <= max_length:
-            await update.message.reply_text(message, parse_mode='Markdown')
-            return
+        reply = await StreamingReply(
+            update.message, edit_interval=edit_interval, outbound=self.outbound
+        ).start()
+        enhanced_message, history = self.build_prompt(message_text, user, chat.id)
         
-        chunks = []
-        while message:
-            if len(message) <= max_length:
-                chunks.append(message)
-                break
-            
-            break_point = message.rfind('\n', 0, max_length)
-            if break_point == -1:
-                break_point = message.rfind('. ', 0, max_length)
-            if break_point == -1:
-                break_point = max_length
-            
-            chunks.append(message[:break_point])
-            message = message[break_point:].lstrip()
+        try:
+            async for token in self.skippy_client.stream_chat(enhanced_message, history):
+                await reply.feed(token)
+            if reply.text:
+                self.remember_turn(chat.id, user, message_text, reply.text)
+        except Exception as e:
+            logger.error(f"Streaming error: {e}")
+            if not reply.text:
+                # Ollama unreachable directly - fall back to the n8n webhook
+                response = await self.send_to_skippy(message_text, user, chat.id)
+                await reply.feed(response or "🔌 Can't reach my brain right now.")
+        
+        await reply.finish()
+        
+        if reply.first_token_latency is not None:
+            self.stream_ttft.append(reply.first_token_latency)
+            logger.info(f"Streaming time to first token: {reply.first_token_latency:.2f}s")
+    
+    async def send_long_message(self, update: Update, message: str):
+        """Split and send long messages"""
+        chunks = split_message(message)
         
         for i, chunk in enumerate(chunks):
             if i == 0:
-                await update.message.reply_text(chunk, parse_mode='Markdown')
+                await self.outbound.reply_text(update.message, chunk, parse_mode='Markdown')
             else:
-                await update.message.reply_text(f"...{chunk}", parse_mode='Markdown')
-            await asyncio.sleep(0.5)
+                await self.outbound.reply_text(update.message, f"...{chunk}", parse_mode='Markdown')
     
     # === SCHEDULER ===
     
-    def start_scheduler(self):
-        """Start the scheduler thread"""
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(1)
-        
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
-        logger.info("Scheduler thread started")
+    def restore_state(self):
+        """Reload persisted state and re-arm saved jobs"""
+        start = time.perf_counter()
+        state = self.state_store.load()
+        
+        self.authorized_users = {int(user_id) for user_id in state.get('users', {})}
+        # Updated in place: the group pre-filter holds a reference to this set
+        self.authorized_groups.clear()
+        self.authorized_groups.update(int(chat_id) for chat_id in state.get('groups', {}))
+        self.user_allowlists.clear()
+        self.user_allowlists.update(
+            (int(chat_id), set(group['allowed_users']))
+            for chat_id, group in state.get('groups', {}).items()
+            if isinstance(group, dict) and 'allowed_users' in group
+        )
+        self.user_preferences = dict(state.get('prefs', {}))
+        
+        # Deadlines used to be one shared list under prefs/deadlines
+        legacy = self.user_preferences.pop('deadlines', None)
+        if legacy:
+            for deadline in legacy:
+                deadline_id = f"{deadline.get('user_id', 0)}_{deadline.get('created', '')}"
+                state.setdefault('deadlines', {})[deadline_id] = deadline
+                self.state_store.put('deadlines', deadline_id, deadline)
+            self.state_store.delete('prefs', 'deadlines')
+        self.user_preferences['deadlines'] = list(state.get('deadlines', {}).values())
+        
+        for job_id, job in state.get('jobs', {}).items():
+            if not self.owns_chat(job.get('chat_id', 0)):
+                continue
+            try:
+                self.add_job(job_id, job, persist=False)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Dropping unreadable job {job_id}: {e}")
+                self.state_store.delete('jobs', job_id)
+        
+        self.broadcaster.restore(state, owns=self.owns_chat)
+        
+        logger.info(
+            f"Restored {len(self.authorized_groups)} groups and "
+            f"{len(self.scheduled_jobs)} jobs in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+    
+    def refresh_destinations(self):
+        """Re-read groups and users from the shared store (other workers add them too)"""
+        users = {int(user_id) for user_id in self.state_store.load_namespace('users')}
+        groups = {int(chat_id) for chat_id in self.state_store.load_namespace('groups')}
+        self.authorized_users |= users
+        self.authorized_groups |= groups   # in place: the group pre-filter holds this set
+        return self.authorized_groups | self.authorized_users
+    
+    def owns_chat(self, chat_id):
+        """Whether this process serves `chat_id` (always true outside webhook mode)"""
+        if not self.partition:
+            return True
+        index, workers = self.partition
+        return worker_for(chat_id, workers) == index
+    
+    async def start_scheduler(self, application):
+        """Bind the timer scheduler and health prober to the bot's event loop"""
+        self.group_filter.configure(application.bot)
+        self.scheduler.start()
+        self.health_prober.start()
+        self.broadcaster.resume()
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Enhanced status with all features"""
         user = update.effective_user
         chat = update.effective_chat
         
-        try:
-            response = requests.get("http://192.168.0.229:5678/", timeout=5)
-            n8n_status = "✅ Online" if response.status_code == 200 else "❌ Offline"
-        except:
-            n8n_status = "❌ Offline"
+        # Rendered from the background prober's snapshot - no network calls here
+        n8n_status = self.health_prober.status_line('n8n')
         
         group_count = len(self.authorized_groups)
         reminder_count = len(self.scheduled_jobs)
+        dispatch = self.update_processor.stats()
+        outbound = self.outbound.stats()
+        prefilter = self.group_filter.stats()
+        voice = self.transcriber.stats()
+        admission = self.admission.stats()
+        
+        if self.stream_ttft:
+            ttft = sorted(self.stream_ttft)[len(self.stream_ttft) // 2]
+            stream_status = f"✅ {len(self.streaming_chats)} chats, first token p50 {ttft * 1000:.0f}ms"
+        else:
+            stream_status = f"✅ {len(self.streaming_chats)} chats"
         
         status_message = f"""
 🤖 **SKIPPY ENHANCED STATUS**
@@ -1028,6 +1431,9 @@ User: {user.first_name} (document analysis via Telegram)
 **Core System:**
 • Bot Status: ✅ Online and Enhanced
 • n8n Backend: {n8n_status}
+• Ollama: {self.health_prober.status_line('ollama')}
+• Postgres: {self.health_prober.status_line('postgres')}
+• Redis: {self.health_prober.status_line('redis')}
 • User: {user.first_name} ({user.id})
 • Chat Type: {chat.type.title()}
 
@@ -1037,6 +1443,12 @@ User: {user.first_name} (document analysis via Telegram)
 • 📁 File Processing: ✅ PDF, DOCX, TXT
 • ⚡ Work Commands: ✅ All Active
 • 📅 Scheduling: ✅ Operational
+• ⚡ Streaming Replies: {stream_status}
+• ⏳ Update Queue: {dispatch['running']}/{dispatch['concurrency_limit']} running, {dispatch['queued']} waiting (p95 wait {dispatch['p95_wait'] * 1000:.0f}ms)
+• 📤 Outbound: {outbound['sent']} sent, {outbound['retries']} rate-limit retries, {outbound['throttled']:.0f}s throttled
+• 🚦 Backend Admission: {admission['running']}/{admission['slots']} busy, {admission['queued']} queued, {sum(admission['rejected'].values())} turned away
+• 🎙️ Voice Notes: {voice['completed']} transcribed, {voice['queued']} queued ({voice['throughput']:.1f} audio-s per s)
+• 🧹 Group Pre-filter: {prefilter['passed']} passed, {prefilter['dropped']} dropped
 
 **Capabilities:**
 • Group chat support
@@ -1056,6 +1468,16 @@ All enhanced systems operational. Ready for serious work!
         
         await update.message.reply_text(status_message, parse_mode='Markdown')
     
+    async def shutdown(self, application):
+        """Stop timers and release pooled connections when the application stops"""
+        self.scheduler.stop()
+        await self.health_prober.stop()
+        await self.broadcaster.stop()
+        self.document_extractor.shutdown()
+        self.transcriber.shutdown()
+        await self.skippy_client.aclose()
+        await asyncio.to_thread(self.state_store.close)
+    
     def run(self):
         """Start the enhanced bot"""
         logger.info("Starting Enhanced Skippy Telegram Bot...")
@@ -1101,9 +1523,9 @@ def main():
         missing_deps.append("python-docx")
     
     try:
-        import schedule
+        import httpx
     except ImportError:
-        missing_deps.append("schedule")
+        missing_deps.append("httpx")
     
     if missing_deps:
         print(f"\n⚠️  Missing dependencies: {', '.join(missing_deps)}")
@@ -1114,9 +1536,26 @@ def main():
         if install != 'y':
             return
     
+    # Telegram user ids allowed to /broadcast, e.g. SKIPPY_ADMIN_IDS=12345,67890
+    admin_ids = {int(uid) for uid in os.environ.get("SKIPPY_ADMIN_IDS", "").split(",") if uid.strip()}
+    
     try:
+        webhook_url = os.environ.get("SKIPPY_WEBHOOK_URL")
+        if webhook_url:
+            # Webhook mode: HTTP ingress plus one bot worker per CPU, state in Redis
+            print(f"🌐 Webhook mode: {webhook_url}")
+            run_webhook_cluster(
+                bot_token,
+                webhook_url=webhook_url,
+                port=int(os.environ.get("SKIPPY_WEBHOOK_PORT", "8443")),
+                workers=int(os.environ.get("SKIPPY_WORKERS", "0")) or None,
+                redis_url=os.environ.get("SKIPPY_REDIS_URL"),   # None: workers share the SQLite file
+                admin_ids=admin_ids
+            )
+            return
+        
         # Create and run enhanced bot
-        bot = EnhancedSkippyBot(bot_token)
+        bot = EnhancedSkippyBot(bot_token, admin_ids=admin_ids)
         bot.run()
         
     except Exception as e:
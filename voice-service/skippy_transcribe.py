@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Skippy Transcribe
+Local voice-note transcription with Whisper in a pool of CPU worker processes
+
+Each worker loads the model once at startup. Jobs wait in per-user queues
+and are handed to free workers round-robin across users, so one person
+sending ten voice notes can't starve everyone else. Notes longer than the
+duration budget are refused before they are even downloaded.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000   # Whisper resamples everything to 16kHz mono
+
+# Checked without importing: torch/whisper only load inside the worker processes
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
+
+
+class TranscriptionRejected(Exception):
+    """A voice note the transcriber won't take (too long, queue full)"""
+
+
+# === WORKER FUNCTIONS (run in the process pool) ===
+
+_model = None
+_max_samples = None
+
+
+def _init_worker(model_name, threads, max_duration):
+    """Preload the Whisper model once per worker process"""
+    global _model, _max_samples
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)   # workers * threads ~= cores, no oversubscription
+    _model = whisper.load_model(model_name, device="cpu")
+    _max_samples = int(max_duration * SAMPLE_RATE)
+
+
+def transcribe_file(path, language=None):
+    """Return (text, audio_seconds, compute_seconds) for one audio file"""
+    import whisper
+
+    start = time.perf_counter()
+    audio = whisper.load_audio(path)[:_max_samples]   # decodes OGG/Opus etc. via ffmpeg
+    result = _model.transcribe(audio, fp16=False, language=language)
+    return result["text"].strip(), len(audio) / SAMPLE_RATE, time.perf_counter() - start
+
+
+# === POOL ===
+
+class VoiceTranscriber:
+    """Fair, bounded queue in front of a pool of Whisper workers"""
+
+    def __init__(self, workers=None, model_name="base", max_duration=300, max_queue=50,
+                 max_per_user=5, language=None):
+        cores = os.cpu_count() or 2
+        self.workers = workers or max(1, cores // 4)
+        self.threads = max(1, cores // self.workers)
+        self.model_name = model_name
+        self.max_duration = max_duration
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.language = language
+
+        self._executor = None
+        self._queues = OrderedDict()   # user_id -> deque of (path, future), round-robin order
+        self._queued = 0
+        self._running = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._busy_since = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.threads, self.max_duration)
+            )
+        return self._executor
+
+    def check(self, user_id, duration):
+        """Raise TranscriptionRejected if a note can't be accepted (call before downloading)"""
+        if duration and duration > self.max_duration:
+            raise TranscriptionRejected(
+                f"Voice notes are limited to {self.max_duration // 60} minutes"
+            )
+        if self._queued >= self.max_queue:
+            raise TranscriptionRejected("Transcription queue is full")
+        if len(self._queues.get(user_id, ())) >= self.max_per_user:
+            raise TranscriptionRejected(f"You already have {self.max_per_user} voice notes waiting")
+
+    async def transcribe(self, user_id, path, duration=None):
+        """Queue a file for transcription and wait for its text"""
+        self.check(user_id, duration)
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append((path, future))
+        self._queued += 1
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self._running < self.workers and self._queues:
+            # Round-robin: take the head of the first user's queue, move the user to the back
+            user_id, queue = self._queues.popitem(last=False)
+            path, future = queue.popleft()
+            if queue:
+                self._queues[user_id] = queue
+            self._queued -= 1
+            if future.cancelled():
+                continue
+
+            try:
+                executor = self._pool()
+                job = loop.run_in_executor(executor, transcribe_file, path, self.language)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # A worker died (OOM, missing whisper...): fail this note, start a fresh pool next time
+                logger.error(f"Transcription pool unavailable: {e}")
+                self._reset_pool()
+                self.failed += 1
+                future.set_exception(e)
+                continue
+
+            if self._running == 0:
+                self._busy_since = time.monotonic()
+            self._running += 1
+            job.add_done_callback(
+                lambda job, future=future, executor=executor: self._finished(job, future, executor))
+
+    def _reset_pool(self, executor=None):
+        if self._executor is not None and executor in (None, self._executor):
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finished(self, job, future, executor=None):
+        self._running -= 1
+        if self._running == 0 and self._busy_since is not None:
+            self.busy_seconds += time.monotonic() - self._busy_since
+            self._busy_since = None
+
+        if job.cancelled():
+            future.cancel()
+        elif job.exception() is not None:
+            self.failed += 1
+            if isinstance(job.exception(), BrokenProcessPool):
+                self._reset_pool(executor)   # unless a fresh pool already replaced it
+            if not future.done():
+                future.set_exception(job.exception())
+        else:
+            text, audio_seconds, compute_seconds = job.result()
+            self.completed += 1
+            self.audio_seconds += audio_seconds
+            self.compute_seconds += compute_seconds
+            if not future.done():
+                future.set_result(text)
+
+        try:
+            self._dispatch()
+        except Exception as e:
+            # Done callbacks swallow exceptions; don't let queued notes wait forever
+            logger.error(f"Transcription dispatch failed: {e}")
+            self._fail_queued(e)
+
+    def _fail_queued(self, error):
+        for queue in self._queues.values():
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(error)
+        self._queues.clear()
+        self._queued = 0
+
+    def stats(self):
+        busy = self.busy_seconds
+        if self._busy_since is not None:
+            busy += time.monotonic() - self._busy_since
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'queued': self._queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'audio_seconds': self.audio_seconds,
+            # audio-seconds transcribed per wall-second while the pool was busy
+            'throughput': self.audio_seconds / busy if busy else 0.0,
+            'realtime_factor': self.audio_seconds / self.compute_seconds if self.compute_seconds else 0.0
+        }
+
+    def shutdown(self):
+        self._reset_pool()
+
+
+def benchmark(path, users=4, notes_per_user=3, workers=None):
+    """Transcribe one sample note many times from several users"""
+    async def run():
+        transcriber = VoiceTranscriber(workers=workers)
+        finished = []
+
+        async def note(user_id, index):
+            text = await transcriber.transcribe(user_id, path)
+            finished.append(user_id)
+            return text
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            note(user_id, index)
+            for user_id in range(users) for index in range(notes_per_user)
+        ))
+        elapsed = time.perf_counter() - start
+        stats = transcriber.stats()
+        transcriber.shutdown()
+
+        print(f"📊 {len(results)} notes from {users} users on {stats['workers']} workers in {elapsed:.1f}s "
+              f"(includes model load)")
+        print(f"   Throughput: {stats['throughput']:.1f} audio-s per wall-s, "
+              f"{stats['realtime_factor']:.1f}x realtime per worker")
+        print(f"   Completion order by user: {finished}")
+        print(f"   Sample: {results[0][:80]!r}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python skippy_transcribe.py <audio file>")
+    else:
+        benchmark(sys.argv[1])
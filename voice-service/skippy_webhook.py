@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Skippy Webhook
+Webhook ingestion for the enhanced Telegram bot, spread over worker processes
+
+A small asyncio HTTP server receives Telegram's webhook POSTs, answers 200
+straight away and hands each update to a worker process chosen by chat id,
+so every chat is always served by the same worker (and stays in order)
+while different chats scale across CPUs. Workers share their durable state
+through Redis. FakeBotAPI stands in for api.telegram.org when testing.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot"
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+MAX_BODY = 1024 * 1024
+
+# Update fields that carry a chat, and ones that only carry a user
+CHAT_FIELDS = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'business_message', 'edited_business_message', 'my_chat_member',
+    'chat_member', 'chat_join_request', 'message_reaction'
+)
+USER_FIELDS = (
+    'inline_query', 'chosen_inline_result', 'shipping_query',
+    'pre_checkout_query', 'poll_answer'
+)
+
+
+def chat_id_of(update):
+    """The chat an update belongs to (falls back to the user, then update_id)"""
+    for field in CHAT_FIELDS:
+        chat = (update.get(field) or {}).get('chat')
+        if chat:
+            return chat['id']
+
+    callback = update.get('callback_query')
+    if callback:
+        message = callback.get('message')
+        if message:
+            return message['chat']['id']
+        return callback['from']['id']
+
+    for field in USER_FIELDS:
+        item = update.get(field) or {}
+        user = item.get('from') or item.get('user')
+        if user:
+            return user['id']
+
+    return update.get('update_id', 0)
+
+
+def worker_for(chat_id, workers):
+    """Stable chat -> worker mapping (Python's % is non-negative here)"""
+    return int(chat_id) % workers
+
+
+# === MINIMAL HTTP SERVER ===
+
+class HTTPServer:
+    """Just enough HTTP/1.1 (keep-alive, Content-Length bodies) for webhooks"""
+
+    def __init__(self, host='0.0.0.0', port=8443, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._serve, self.host, self.port, ssl=self.ssl_context
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def handle(self, method, path, headers, body):
+        """Return (status, payload dict); override in subclasses"""
+        return 404, {'ok': False}
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'ok': False})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.handle(method, target.split('?', 1)[0], headers, body)
+                except Exception as e:
+                    logger.error(f"Request handling failed: {e}")
+                    status, payload = 500, {'ok': False}
+                await self._respond(writer, status, payload)
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+
+class WebhookIngress(HTTPServer):
+    """Receives Telegram updates and routes them to worker queues by chat id"""
+
+    def __init__(self, queues, path="/telegram", secret_token=None, **server_options):
+        super().__init__(**server_options)
+        self.queues = queues
+        self.path = path
+        self.secret_token = secret_token
+
+        self.received = 0
+        self.rejected = 0
+        self.per_worker = [0] * len(queues)
+
+    async def handle(self, method, path, headers, body):
+        if method == 'GET' and path == '/healthz':
+            return 200, self.stats()
+        if method != 'POST' or path != self.path:
+            return 404, {'ok': False}
+
+        if self.secret_token and not hmac.compare_digest(
+                headers.get(SECRET_HEADER, ''), self.secret_token):
+            self.rejected += 1
+            return 403, {'ok': False}
+
+        update = json.loads(body)
+        index = worker_for(chat_id_of(update), len(self.queues))
+        # Workers re-parse the JSON themselves; only the raw bytes cross processes
+        self.queues[index].put_nowait(body)
+        self.received += 1
+        self.per_worker[index] += 1
+        return 200, {'ok': True}
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'per_worker': self.per_worker
+        }
+
+
+# === WORKERS ===
+
+def _worker_main(index, workers, queue, ready, bot_token, bot_options):
+    """Entry point of one worker process: a full bot without a poller"""
+    from skippy_telegram_enhanced import EnhancedSkippyBot
+
+    bot = EnhancedSkippyBot(bot_token, partition=(index, workers), **bot_options)
+    try:
+        asyncio.run(_serve_updates(bot, queue, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve_updates(bot, queue, ready):
+    from telegram import Update
+
+    application = bot.application
+    await application.initialize()
+    await bot.start_scheduler(application)
+    await application.start()
+    ready.set()
+
+    try:
+        while True:
+            body = await asyncio.to_thread(queue.get)
+            if body is None:
+                break
+            update = Update.de_json(json.loads(body), application.bot)
+            await application.update_queue.put(update)
+    finally:
+        await application.stop()
+        await application.shutdown()
+        await bot.shutdown(application)
+
+
+class WebhookCluster:
+    """The ingress server plus its worker processes"""
+
+    def __init__(self, bot_token, webhook_url=None, host='0.0.0.0', port=8443, path="/telegram",
+                 workers=None, secret_token=None, base_url=TELEGRAM_API_URL, ssl_context=None,
+                 **bot_options):
+        self.bot_token = bot_token
+        self.webhook_url = webhook_url
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.secret_token = secret_token or (secrets.token_urlsafe(32) if webhook_url else None)
+        self.base_url = base_url
+        self.bot_options = dict(bot_options, base_url=base_url)
+
+        # spawn, so workers start the same way on Windows and Linux
+        self._context = multiprocessing.get_context('spawn')
+        self.queues = [self._context.Queue() for _ in range(self.workers)]
+        self.processes = []
+        self.ingress = WebhookIngress(
+            self.queues, path=path, secret_token=self.secret_token,
+            host=host, port=port, ssl_context=ssl_context
+        )
+
+    async def start(self, ready_timeout=60):
+        ready_events = []
+        for index, queue in enumerate(self.queues):
+            ready = self._context.Event()
+            # Not daemonic: workers run their own process pools (documents, Whisper),
+            # and daemonic processes can't have children. stop() joins them.
+            process = self._context.Process(
+                target=_worker_main,
+                args=(index, self.workers, queue, ready, self.bot_token, self.bot_options),
+                name=f"skippy-worker-{index}"
+            )
+            process.start()
+            self.processes.append(process)
+            ready_events.append(ready)
+
+        try:
+            for index, ready in enumerate(ready_events):
+                if not await asyncio.to_thread(ready.wait, ready_timeout):
+                    raise RuntimeError(f"Worker {index} did not start within {ready_timeout}s")
+            await self.ingress.start()
+        except BaseException:
+            await self.stop()   # non-daemonic workers would otherwise keep us alive
+            raise
+        logger.info(f"Webhook ingress on port {self.ingress.port} with {self.workers} workers")
+
+        if self.webhook_url:
+            await self._bot_api('setWebhook', url=self.webhook_url, secret_token=self.secret_token,
+                                allowed_updates=[], max_connections=100)
+            logger.info(f"Telegram webhook set to {self.webhook_url}")
+        return self
+
+    async def stop(self):
+        await self.ingress.stop()
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, 15)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    async def _bot_api(self, method, **params):
+        import httpx
+
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(f"{self.base_url}{self.bot_token}/{method}", json=params)
+            response.raise_for_status()
+            return response.json()
+
+
+def run_webhook_cluster(bot_token, **options):
+    """Run the ingress and workers until interrupted"""
+    async def serve():
+        cluster = await WebhookCluster(bot_token, **options).start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await cluster.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        logger.info("Webhook cluster stopped by user")
+
+
+# === FAKE BOT API (testing) ===
+
+class FakeBotAPI(HTTPServer):
+    """Local stand-in for api.telegram.org; records what the bot sends"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__(host=host, port=port)
+        self.calls = []
+        self.sent = []
+        self._message_id = 0
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def handle(self, method, path, headers, body):
+        api_method = path.rsplit('/', 1)[-1]
+        params = json.loads(body) if body and headers.get('content-type', '').startswith('application/json') else {}
+        if body and not params:
+            from urllib.parse import parse_qsl
+            params = dict(parse_qsl(body.decode()))
+        self.calls.append(api_method)
+
+        if api_method == 'getMe':
+            return 200, {'ok': True, 'result': {
+                'id': 1, 'is_bot': True, 'first_name': 'Skippy', 'username': 'skippy_test_bot',
+                'can_join_groups': True, 'can_read_all_group_messages': False,
+                'supports_inline_queries': False
+            }}
+        if api_method == 'sendMessage':
+            self._message_id += 1
+            chat_id = int(params['chat_id'])
+            self.sent.append((time.monotonic(), chat_id, params.get('text', '')))
+            return 200, {'ok': True, 'result': {
+                'message_id': self._message_id, 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+                'text': params.get('text', '')
+            }}
+        return 200, {'ok': True, 'result': True}
+
+
+def fake_command_update(update_id, chat_id, command="/help"):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Tester'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Tester'},
+            'text': command,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        }
+    }
+
+
+def benchmark(workers=2, chats=40, commands_per_chat=3, state_path="/tmp/skippy_webhook_bench.db"):
+    """End-to-end: POST updates to the ingress, wait for replies at the fake Bot API"""
+    import httpx
+
+    async def run():
+        api = await FakeBotAPI().start()
+        cluster = WebhookCluster(
+            "123456:TEST", host='127.0.0.1', port=0, workers=workers,
+            base_url=api.base_url, state_path=state_path
+        )
+        start = time.perf_counter()
+        await cluster.start()
+        print(f"🚀 {workers} workers ready in {time.perf_counter() - start:.1f}s")
+
+        total = chats * commands_per_chat
+        url = f"http://127.0.0.1:{cluster.ingress.port}/telegram"
+        posted = {}
+        async with httpx.AsyncClient() as client:
+            start = time.monotonic()
+            update_id = 0
+            for _ in range(commands_per_chat):
+                for chat_id in range(1, chats + 1):
+                    update_id += 1
+                    posted[update_id] = time.monotonic()
+                    await client.post(url, json=fake_command_update(update_id, chat_id))
+            ingest = time.monotonic() - start
+
+            while len(api.sent) < total and time.monotonic() - start < 30:
+                await asyncio.sleep(0.05)
+            elapsed = time.monotonic() - start
+
+        await cluster.stop()
+        await api.stop()
+
+        print(f"📊 {total} updates from {chats} chats")
+        print(f"   Ingest:  {ingest * 1000:.0f}ms ({total / ingest:.0f} updates/s acknowledged)")
+        print(f"   Replies: {len(api.sent)}/{total} in {elapsed:.2f}s")
+        print(f"   Routing: {cluster.ingress.stats()['per_worker']} updates per worker")
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(state_path + suffix):
+            os.remove(state_path + suffix)
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    benchmark()